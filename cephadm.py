@@ -1,8 +1,7 @@
 #!/usr/bin/python3
 
-import asyncio
-import asyncio.subprocess
 import argparse
+import copy
 import datetime
 import fcntl
 import ipaddress
@@ -24,26 +23,36 @@ import time
 import errno
 import struct
 from socketserver import ThreadingMixIn
+from http.client import HTTPConnection, HTTPException
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import signal
 import io
-from contextlib import redirect_stdout
+from contextlib import contextmanager, redirect_stdout
 import ssl
 from enum import Enum
 
-from typing import Dict, List, Tuple, Optional, Union, Any, NoReturn, Callable, IO
+from typing import Dict, List, Tuple, Optional, Union, Any, NoReturn, Callable, IO, Set, Iterator
 
 import re
 import uuid
 
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
-from functools import wraps
+from functools import lru_cache, wraps
 from glob import glob
 from io import StringIO
 from threading import Thread, RLock
 from urllib.error import HTTPError
+from urllib.parse import quote
 from urllib.request import urlopen
 from pathlib import Path
+from stat import S_ISREG
+
+try:
+    # optional, considerably faster for the larger `ceph ... -f json` outputs
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 # Default container images -----------------------------------------------------
 DEFAULT_IMAGE = 'quay.ceph.io/ceph-ci/ceph:master'
@@ -104,6 +113,14 @@ cached_stdin = None
 
 class BaseConfig:
 
+    __slots__ = (
+        'image', 'docker', 'data_dir', 'log_dir', 'logrotate_dir',
+        'sysctl_dir', 'unit_dir', 'verbose', 'timeout', 'retry', 'env',
+        'memory_request', 'memory_limit', 'log_to_journald',
+        'container_init', 'container_engine',
+    )
+    _FIELDS = frozenset(__slots__)
+
     def __init__(self):
         self.image: str = ''
         self.docker: bool = False
@@ -125,20 +142,21 @@ class BaseConfig:
 
     def set_from_args(self, args: argparse.Namespace):
         argdict: Dict[str, Any] = vars(args)
-        for k, v in argdict.items():
-            if hasattr(self, k):
-                setattr(self, k, v)
+        for k in BaseConfig._FIELDS.intersection(argdict):
+            setattr(self, k, argdict[k])
 
 
 class CephadmContext:
 
     def __init__(self):
         self.__dict__['_args'] = None
+        self.__dict__['_args_fields'] = frozenset()
         self.__dict__['_conf'] = BaseConfig()
 
     def set_args(self, args: argparse.Namespace) -> None:
         self._conf.set_from_args(args)
-        self._args = args
+        self.__dict__['_args'] = args
+        self.__dict__['_args_fields'] = frozenset(vars(args))
 
     def has_function(self) -> bool:
         return 'func' in self._args
@@ -147,17 +165,18 @@ class CephadmContext:
         return hasattr(self, name)
 
     def __getattr__(self, name: str) -> Any:
-        if '_conf' in self.__dict__ and hasattr(self._conf, name):
-            return getattr(self._conf, name)
-        elif '_args' in self.__dict__ and hasattr(self._args, name):
-            return getattr(self._args, name)
+        d = self.__dict__
+        if name in BaseConfig._FIELDS and '_conf' in d:
+            return getattr(d['_conf'], name)
+        elif name in d.get('_args_fields', ()):
+            return getattr(d['_args'], name)
         else:
             return super().__getattribute__(name)
 
     def __setattr__(self, name: str, value: Any) -> None:
-        if hasattr(self._conf, name):
+        if name in BaseConfig._FIELDS:
             setattr(self._conf, name, value)
-        elif hasattr(self._args, name):
+        elif name in self._args_fields:
             setattr(self._args, name, value)
         else:
             super().__setattr__(name, value)
@@ -166,6 +185,8 @@ class CephadmContext:
 class ContainerEngine:
     def __init__(self):
         self.path = find_program(self.EXE)
+        # argv prefix to run a command in an existing container
+        self.exec_prefix = (self.path, 'exec')
 
     @property
     def EXE(self) -> str:
@@ -174,10 +195,14 @@ class ContainerEngine:
 
 class Podman(ContainerEngine):
     EXE = 'podman'
+    API_SOCKET = '/run/podman/podman.sock'
+
+    # podman versions already queried, keyed by binary path
+    _versions: Dict[str, Tuple[int, ...]] = {}
 
     def __init__(self):
         super().__init__()
-        self._version = None
+        self._version = self._versions.get(self.path)
 
     @property
     def version(self):
@@ -186,18 +211,34 @@ class Podman(ContainerEngine):
         return self._version
 
     def get_version(self, ctx: CephadmContext):
+        if self._version is not None:
+            return
         out, _, _ = call_throws(ctx, [self.path, 'version', '--format', '{{.Client.Version}}'])
         self._version = _parse_podman_version(out)
+        self._versions[self.path] = self._version
+
+
+PODMAN_AUTHFILE = '/etc/ceph/podman-auth.json'
+
+
+@lru_cache(maxsize=1)
+def has_podman_authfile():
+    # type: () -> bool
+    # stat once per run; registry_login() clears this after creating it
+    return os.path.exists(PODMAN_AUTHFILE)
 
 
 class Docker(ContainerEngine):
     EXE = 'docker'
+    API_SOCKET = '/var/run/docker.sock'
 
 
 CONTAINER_PREFERENCE = (Podman, Docker)  # prefer podman to docker
 
 
 # Log and console output config
+_LOGGING_CONFIGURED = False
+
 logging_config = {
     'version': 1,
     'disable_existing_loggers': True,
@@ -216,17 +257,35 @@ logging_config = {
             'class': 'logging.handlers.WatchedFileHandler',
             'formatter': 'cephadm',
             'filename': '%s/cephadm.log' % LOG_DIR,
+            'delay': True,
+        },
+        # buffer the (chatty) debug records in memory and hand them to the
+        # log file in small batches; any INFO or higher record flushes the
+        # buffer, so progress messages are never held back. The rest is
+        # flushed at exit and on SIGTERM (see main()).
+        'log_file_buffer': {
+            'level': 'DEBUG',
+            'class': 'logging.handlers.MemoryHandler',
+            'capacity': 64,
+            'flushLevel': logging.INFO,
+            'target': 'log_file',
         }
     },
     'loggers': {
         '': {
             'level': 'DEBUG',
-            'handlers': ['console', 'log_file'],
+            'handlers': ['console', 'log_file_buffer'],
         }
     }
 }
 
 
+def flush_log_handlers():
+    # type: () -> None
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
 class termcolor:
     yellow = '\033[93m'
     red = '\033[31m'
@@ -252,12 +311,12 @@ class Ceph(object):
 
 class OSD(object):
     @staticmethod
-    def get_sysctl_settings() -> List[str]:
-        return [
+    def get_sysctl_settings() -> Tuple[str, ...]:
+        return (
             '# allow a large number of OSDs',
             'fs.aio-max-nr = 1048576',
             'kernel.pid_max = 4194304',
-        ]
+        )
 
 ##################################
 
@@ -266,10 +325,10 @@ class Monitoring(object):
     """Define the configs for the monitoring containers"""
 
     port_map = {
-        'prometheus': [9095],  # Avoid default 9090, due to conflict with cockpit UI
-        'node-exporter': [9100],
-        'grafana': [3000],
-        'alertmanager': [9093, 9094],
+        'prometheus': (9095,),  # Avoid default 9090, due to conflict with cockpit UI
+        'node-exporter': (9100,),
+        'grafana': (3000,),
+        'alertmanager': (9093, 9094),
     }
 
     components = {
@@ -277,47 +336,81 @@ class Monitoring(object):
             'image': DEFAULT_PROMETHEUS_IMAGE,
             'cpus': '2',
             'memory': '4GB',
-            'args': [
+            'args': (
                 '--config.file=/etc/prometheus/prometheus.yml',
                 '--storage.tsdb.path=/prometheus',
-            ],
-            'config-json-files': [
+            ),
+            'config-json-files': (
                 'prometheus.yml',
-            ],
+            ),
+            # daemon dirs below the data dir, the first one holds the config
+            'dirs': (
+                'etc/prometheus',
+                'etc/prometheus/alerting',
+                'data',
+            ),
+            'mounts': (
+                ('etc/prometheus', '/etc/prometheus:Z'),
+                ('data', '/prometheus:Z'),
+            ),
         },
         'node-exporter': {
             'image': DEFAULT_NODE_EXPORTER_IMAGE,
             'cpus': '1',
             'memory': '1GB',
-            'args': [
+            'args': (
                 '--no-collector.timex',
-            ],
+            ),
+            'mounts': (
+                ('/proc', '/host/proc:ro'),
+                ('/sys', '/host/sys:ro'),
+                ('/', '/rootfs:ro'),
+            ),
         },
         'grafana': {
             'image': DEFAULT_GRAFANA_IMAGE,
             'cpus': '2',
             'memory': '4GB',
-            'args': [],
-            'config-json-files': [
+            'args': (),
+            'config-json-files': (
                 'grafana.ini',
                 'provisioning/datasources/ceph-dashboard.yml',
                 'certs/cert_file',
                 'certs/cert_key',
-            ],
+            ),
+            'dirs': (
+                'etc/grafana',
+                'etc/grafana/certs',
+                'etc/grafana/provisioning/datasources',
+                'data',
+            ),
+            'mounts': (
+                ('etc/grafana/grafana.ini', '/etc/grafana/grafana.ini:Z'),
+                ('etc/grafana/provisioning/datasources', '/etc/grafana/provisioning/datasources:Z'),
+                ('etc/grafana/certs', '/etc/grafana/certs:Z'),
+                ('data/grafana.db', '/var/lib/grafana/grafana.db:Z'),
+            ),
         },
         'alertmanager': {
             'image': DEFAULT_ALERT_MANAGER_IMAGE,
             'cpus': '2',
             'memory': '2GB',
-            'args': [
+            'args': (
                 '--cluster.listen-address=:{}'.format(port_map['alertmanager'][1]),
-            ],
-            'config-json-files': [
+            ),
+            'config-json-files': (
                 'alertmanager.yml',
-            ],
-            'config-json-args': [
+            ),
+            'config-json-args': (
                 'peers',
-            ],
+            ),
+            'dirs': (
+                'etc/alertmanager',
+                'etc/alertmanager/data',
+            ),
+            'mounts': (
+                ('etc/alertmanager', '/etc/alertmanager:Z'),
+            ),
         },
     }  # type: ignore
 
@@ -333,17 +426,18 @@ class Monitoring(object):
         err = ''
         version = ''
         if daemon_type == 'alertmanager':
-            for cmd in ['alertmanager', 'prometheus-alertmanager']:
-                _, err, code = call(ctx, [
-                    ctx.container_engine.path, 'exec', container_id, cmd,
-                    '--version'
-                ], verbosity=CallVerbosity.DEBUG)
-                if code == 0:
-                    break
+            # the binary name differs between images; resolve it inside the
+            # container so we only need a single exec
+            _, err, code = call(ctx, [
+                *ctx.container_engine.exec_prefix, container_id, 'sh', '-c',
+                'if command -v alertmanager >/dev/null; '
+                'then exec alertmanager --version; '
+                'else exec prometheus-alertmanager --version; fi'
+            ], verbosity=CallVerbosity.DEBUG)
             cmd = 'alertmanager'  # reset cmd for version extraction
         else:
             _, err, code = call(ctx, [
-                ctx.container_engine.path, 'exec', container_id, cmd, '--version'
+                *ctx.container_engine.exec_prefix, container_id, cmd, '--version'
             ], verbosity=CallVerbosity.DEBUG)
         if code == 0 and \
                 err.startswith('%s, version ' % cmd):
@@ -353,17 +447,40 @@ class Monitoring(object):
 ##################################
 
 
+def write_files(base_dir, files, uid, gid):
+    # type: (str, List[Tuple[str, bytes]], int, int) -> None
+    """write pre-encoded (relative path, content) pairs below base_dir"""
+    if not files:
+        return
+    dir_fd = os.open(base_dir, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        for fname, data in files:
+            fd = os.open(fname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600,
+                         dir_fd=dir_fd)
+            try:
+                os.fchown(fd, uid, gid)
+                # the open() mode only applies to newly created files
+                os.fchmod(fd, 0o600)
+                while data:
+                    data = data[os.write(fd, data):]
+            finally:
+                os.close(fd)
+    finally:
+        os.close(dir_fd)
+
+
 def populate_files(config_dir, config_files, uid, gid):
     # type: (str, Dict, int, int) -> None
     """create config files for different services"""
+    payloads = []
     for fname in config_files:
-        config_file = os.path.join(config_dir, fname)
-        config_content = dict_get_join(config_files, fname)
-        logger.info('Write file: %s' % (config_file))
-        with open(config_file, 'w', encoding='utf-8') as f:
-            os.fchown(f.fileno(), uid, gid)
-            os.fchmod(f.fileno(), 0o600)
-            f.write(config_content)
+        logger.info('Write file: %s' % os.path.join(config_dir, fname))
+        content = dict_get_join(config_files, fname)
+        payloads.append((fname, content.encode('utf-8')))
+    write_files(config_dir, payloads, uid, gid)
+
+
+NFS_GANESHA_VERSION_RE = re.compile(r'NFS-Ganesha Release\s*=\s*[V]*([\d.]+)')
 
 
 class NFSGanesha(object):
@@ -392,16 +509,21 @@ class NFSGanesha(object):
         self.image = image
 
         # config-json options
-        self.pool = dict_get(config_json, 'pool', require=True)
-        self.namespace = dict_get(config_json, 'namespace')
-        self.userid = dict_get(config_json, 'userid')
-        self.extra_args = dict_get(config_json, 'extra_args', [])
-        self.files = dict_get(config_json, 'files', {})
-        self.rgw = dict_get(config_json, 'rgw', {})
+        if 'pool' not in config_json:
+            raise Error('pool missing from dict')
+        self.pool = config_json['pool']
+        self.namespace = config_json.get('namespace')
+        self.userid = config_json.get('userid')
+        self.extra_args = config_json.get('extra_args', [])
+        self.files = config_json.get('files', {})
+        self.rgw = config_json.get('rgw', {})
 
         # validate the supplied args
         self.validate()
 
+        self._daemon_name = '%s.%s' % (self.daemon_type, self.daemon_id)
+        self._container_name = 'ceph-%s-%s' % (self.fsid, self._daemon_name)
+
     @classmethod
     def init(cls, ctx, fsid, daemon_id):
         # type: (CephadmContext, str, Union[int, str]) -> NFSGanesha
@@ -409,10 +531,11 @@ class NFSGanesha(object):
 
     def get_container_mounts(self, data_dir):
         # type: (str) -> Dict[str, str]
-        mounts = dict()
-        mounts[os.path.join(data_dir, 'config')] = '/etc/ceph/ceph.conf:z'
-        mounts[os.path.join(data_dir, 'keyring')] = '/etc/ceph/keyring:z'
-        mounts[os.path.join(data_dir, 'etc/ganesha')] = '/etc/ganesha:z'
+        mounts = {
+            os.path.join(data_dir, 'config'): '/etc/ceph/ceph.conf:z',
+            os.path.join(data_dir, 'keyring'): '/etc/ceph/keyring:z',
+            os.path.join(data_dir, 'etc/ganesha'): '/etc/ganesha:z',
+        }
         if self.rgw:
             cluster = self.rgw.get('cluster', 'ceph')
             rgw_user = self.rgw.get('user', 'admin')
@@ -422,22 +545,21 @@ class NFSGanesha(object):
 
     @staticmethod
     def get_container_envs():
-        # type: () -> List[str]
-        envs = [
-            'CEPH_CONF=%s' % ('/etc/ceph/ceph.conf')
-        ]
-        return envs
+        # type: () -> Tuple[str, ...]
+        return (
+            'CEPH_CONF=/etc/ceph/ceph.conf',
+        )
 
     @staticmethod
     def get_version(ctx, container_id):
         # type: (CephadmContext, str) -> Optional[str]
         version = None
         out, err, code = call(ctx,
-                              [ctx.container_engine.path, 'exec', container_id,
+                              [*ctx.container_engine.exec_prefix, container_id,
                                NFSGanesha.entrypoint, '-v'],
                               verbosity=CallVerbosity.DEBUG)
         if code == 0:
-            match = re.search(r'NFS-Ganesha Release\s*=\s*[V]*([\d.]+)', out)
+            match = NFS_GANESHA_VERSION_RE.search(out)
             if match:
                 version = match.group(1)
         return version
@@ -466,14 +588,13 @@ class NFSGanesha(object):
 
     def get_daemon_name(self):
         # type: () -> str
-        return '%s.%s' % (self.daemon_type, self.daemon_id)
+        return self._daemon_name
 
     def get_container_name(self, desc=None):
         # type: (Optional[str]) -> str
-        cname = 'ceph-%s-%s' % (self.fsid, self.get_daemon_name())
         if desc:
-            cname = '%s-%s' % (cname, desc)
-        return cname
+            return '%s-%s' % (self._container_name, desc)
+        return self._container_name
 
     def get_daemon_args(self):
         # type: () -> List[str]
@@ -526,11 +647,14 @@ class CephIscsi(object):
         self.image = image
 
         # config-json options
-        self.files = dict_get(config_json, 'files', {})
+        self.files = config_json.get('files', {})
 
         # validate the supplied args
         self.validate()
 
+        self._daemon_name = '%s.%s' % (self.daemon_type, self.daemon_id)
+        self._container_name = 'ceph-%s-%s' % (self.fsid, self._daemon_name)
+
     @classmethod
     def init(cls, ctx, fsid, daemon_id):
         # type: (CephadmContext, str, Union[int, str]) -> CephIscsi
@@ -540,14 +664,14 @@ class CephIscsi(object):
     @staticmethod
     def get_container_mounts(data_dir, log_dir):
         # type: (str, str) -> Dict[str, str]
-        mounts = dict()
-        mounts[os.path.join(data_dir, 'config')] = '/etc/ceph/ceph.conf:z'
-        mounts[os.path.join(data_dir, 'keyring')] = '/etc/ceph/keyring:z'
-        mounts[os.path.join(data_dir, 'iscsi-gateway.cfg')] = '/etc/ceph/iscsi-gateway.cfg:z'
-        mounts[os.path.join(data_dir, 'configfs')] = '/sys/kernel/config'
-        mounts[log_dir] = '/var/log/rbd-target-api:z'
-        mounts['/dev'] = '/dev'
-        return mounts
+        return {
+            os.path.join(data_dir, 'config'): '/etc/ceph/ceph.conf:z',
+            os.path.join(data_dir, 'keyring'): '/etc/ceph/keyring:z',
+            os.path.join(data_dir, 'iscsi-gateway.cfg'): '/etc/ceph/iscsi-gateway.cfg:z',
+            os.path.join(data_dir, 'configfs'): '/sys/kernel/config',
+            log_dir: '/var/log/rbd-target-api:z',
+            '/dev': '/dev',
+        }
 
     @staticmethod
     def get_container_binds():
@@ -565,7 +689,7 @@ class CephIscsi(object):
         # type: (CephadmContext, str) -> Optional[str]
         version = None
         out, err, code = call(ctx,
-                              [ctx.container_engine.path, 'exec', container_id,
+                              [*ctx.container_engine.exec_prefix, container_id,
                                '/usr/bin/python3', '-c', "import pkg_resources; print(pkg_resources.require('ceph_iscsi')[0].version)"],
                               verbosity=CallVerbosity.DEBUG)
         if code == 0:
@@ -589,14 +713,13 @@ class CephIscsi(object):
 
     def get_daemon_name(self):
         # type: () -> str
-        return '%s.%s' % (self.daemon_type, self.daemon_id)
+        return self._daemon_name
 
     def get_container_name(self, desc=None):
         # type: (Optional[str]) -> str
-        cname = 'ceph-%s-%s' % (self.fsid, self.get_daemon_name())
         if desc:
-            cname = '%s-%s' % (cname, desc)
-        return cname
+            return '%s-%s' % (self._container_name, desc)
+        return self._container_name
 
     def create_daemon_dirs(self, data_dir, uid, gid):
         # type: (str, int, int) -> None
@@ -652,10 +775,13 @@ class HAproxy(object):
         self.image = image
 
         # config-json options
-        self.files = dict_get(config_json, 'files', {})
+        self.files = config_json.get('files', {})
 
         self.validate()
 
+        self._daemon_name = '%s.%s' % (self.daemon_type, self.daemon_id)
+        self._container_name = 'ceph-%s-%s' % (self.fsid, self._daemon_name)
+
     @classmethod
     def init(cls, ctx: CephadmContext,
              fsid: str, daemon_id: Union[int, str]) -> 'HAproxy':
@@ -694,14 +820,13 @@ class HAproxy(object):
 
     def get_daemon_name(self):
         # type: () -> str
-        return '%s.%s' % (self.daemon_type, self.daemon_id)
+        return self._daemon_name
 
     def get_container_name(self, desc=None):
         # type: (Optional[str]) -> str
-        cname = 'ceph-%s-%s' % (self.fsid, self.get_daemon_name())
         if desc:
-            cname = '%s-%s' % (cname, desc)
-        return cname
+            return '%s-%s' % (self._container_name, desc)
+        return self._container_name
 
     def extract_uid_gid_haproxy(self):
         # better directory for this?
@@ -709,16 +834,14 @@ class HAproxy(object):
 
     @staticmethod
     def get_container_mounts(data_dir: str) -> Dict[str, str]:
-        mounts = dict()
-        mounts[os.path.join(data_dir, 'haproxy')] = '/var/lib/haproxy'
-        return mounts
+        return {os.path.join(data_dir, 'haproxy'): '/var/lib/haproxy'}
 
     @staticmethod
-    def get_sysctl_settings() -> List[str]:
-        return [
+    def get_sysctl_settings() -> Tuple[str, ...]:
+        return (
             '# IP forwarding',
             'net.ipv4.ip_forward = 1',
-        ]
+        )
 
 ##################################
 
@@ -739,10 +862,13 @@ class Keepalived(object):
         self.image = image
 
         # config-json options
-        self.files = dict_get(config_json, 'files', {})
+        self.files = config_json.get('files', {})
 
         self.validate()
 
+        self._daemon_name = '%s.%s' % (self.daemon_type, self.daemon_id)
+        self._container_name = 'ceph-%s-%s' % (self.fsid, self._daemon_name)
+
     @classmethod
     def init(cls, ctx: CephadmContext, fsid: str,
              daemon_id: Union[int, str]) -> 'Keepalived':
@@ -778,33 +904,31 @@ class Keepalived(object):
 
     def get_daemon_name(self):
         # type: () -> str
-        return '%s.%s' % (self.daemon_type, self.daemon_id)
+        return self._daemon_name
 
     def get_container_name(self, desc=None):
         # type: (Optional[str]) -> str
-        cname = 'ceph-%s-%s' % (self.fsid, self.get_daemon_name())
         if desc:
-            cname = '%s-%s' % (cname, desc)
-        return cname
+            return '%s-%s' % (self._container_name, desc)
+        return self._container_name
 
     @staticmethod
     def get_container_envs():
-        # type: () -> List[str]
-        envs = [
+        # type: () -> Tuple[str, ...]
+        return (
             'KEEPALIVED_AUTOCONF=false',
             'KEEPALIVED_CONF=/etc/keepalived/keepalived.conf',
             'KEEPALIVED_CMD=/usr/sbin/keepalived -n -l -f /etc/keepalived/keepalived.conf',
             'KEEPALIVED_DEBUG=false'
-        ]
-        return envs
+        )
 
     @staticmethod
-    def get_sysctl_settings() -> List[str]:
-        return [
+    def get_sysctl_settings() -> Tuple[str, ...]:
+        return (
             '# IP forwarding and non-local bind',
             'net.ipv4.ip_forward = 1',
             'net.ipv4.ip_nonlocal_bind = 1',
-        ]
+        )
 
     def extract_uid_gid_keepalived(self):
         # better directory for this?
@@ -812,9 +936,7 @@ class Keepalived(object):
 
     @staticmethod
     def get_container_mounts(data_dir: str) -> Dict[str, str]:
-        mounts = dict()
-        mounts[os.path.join(data_dir, 'keepalived.conf')] = '/etc/keepalived/keepalived.conf'
-        return mounts
+        return {os.path.join(data_dir, 'keepalived.conf'): '/etc/keepalived/keepalived.conf'}
 
 ##################################
 
@@ -831,17 +953,17 @@ class CustomContainer(object):
         self.image = image
 
         # config-json options
-        self.entrypoint = dict_get(config_json, 'entrypoint')
-        self.uid = dict_get(config_json, 'uid', 65534)  # nobody
-        self.gid = dict_get(config_json, 'gid', 65534)  # nobody
-        self.volume_mounts = dict_get(config_json, 'volume_mounts', {})
-        self.args = dict_get(config_json, 'args', [])
-        self.envs = dict_get(config_json, 'envs', [])
-        self.privileged = dict_get(config_json, 'privileged', False)
-        self.bind_mounts = dict_get(config_json, 'bind_mounts', [])
-        self.ports = dict_get(config_json, 'ports', [])
-        self.dirs = dict_get(config_json, 'dirs', [])
-        self.files = dict_get(config_json, 'files', {})
+        self.entrypoint = config_json.get('entrypoint')
+        self.uid = config_json.get('uid', 65534)  # nobody
+        self.gid = config_json.get('gid', 65534)  # nobody
+        self.volume_mounts = config_json.get('volume_mounts', {})
+        self.args = config_json.get('args', [])
+        self.envs = config_json.get('envs', [])
+        self.privileged = config_json.get('privileged', False)
+        self.bind_mounts = config_json.get('bind_mounts', [])
+        self.ports = config_json.get('ports', [])
+        self.dirs = config_json.get('dirs', [])
+        self.files = config_json.get('files', {})
 
     @classmethod
     def init(cls, ctx: CephadmContext,
@@ -864,14 +986,13 @@ class CustomContainer(object):
             dir_path = os.path.join(data_dir, dir_path.strip('/'))
             makedirs(dir_path, uid, gid, 0o755)
 
-        for file_path in self.files:
-            logger.info('Creating file: {}'.format(file_path))
-            content = dict_get_join(self.files, file_path)
-            file_path = os.path.join(data_dir, file_path.strip('/'))
-            with open(file_path, 'w', encoding='utf-8') as f:
-                os.fchown(f.fileno(), uid, gid)
-                os.fchmod(f.fileno(), 0o600)
-                f.write(content)
+        if self.files:
+            logger.info('Creating files: {}'.format(', '.join(self.files)))
+            payloads = []
+            for file_path in self.files:
+                content = dict_get_join(self.files, file_path)
+                payloads.append((file_path.strip('/'), content.encode('utf-8')))
+            write_files(data_dir, payloads, uid, gid)
 
     def get_daemon_args(self) -> List[str]:
         return []
@@ -898,11 +1019,8 @@ class CustomContainer(object):
             /var/lib/ceph/<cluster-fsid>/<daemon-name>/foo/conf: /conf
         }
         """
-        mounts = {}
-        for source, destination in self.volume_mounts.items():
-            source = os.path.join(data_dir, source)
-            mounts[source] = destination
-        return mounts
+        return {os.path.join(data_dir, source): destination
+                for source, destination in self.volume_mounts.items()}
 
     def get_container_binds(self, data_dir: str) -> List[List[str]]:
         """
@@ -926,10 +1044,9 @@ class CustomContainer(object):
         binds = self.bind_mounts.copy()
         for bind in binds:
             for index, value in enumerate(bind):
-                match = re.match(r'^source=(.+)$', value)
-                if match:
+                if value.startswith('source=') and len(value) > 7:
                     bind[index] = 'source={}'.format(os.path.join(
-                        data_dir, match.group(1)))
+                        data_dir, value[7:]))
         return binds
 
 ##################################
@@ -958,8 +1075,11 @@ def dict_get(d: Dict, key: str, default: Any = None, require: bool = False) -> A
     :raises: :exc:`self.Error` if the given key does not exist
         and `require` is set to `True`.
     """
-    if require and key not in d.keys():
-        raise Error('{} missing from dict'.format(key))
+    if require:
+        try:
+            return d[key]
+        except KeyError:
+            raise Error('{} missing from dict'.format(key))
     return d.get(key, default)  # type: ignore
 
 ##################################
@@ -983,16 +1103,19 @@ def dict_get_join(d: Dict, key: str) -> Any:
 ##################################
 
 
+@lru_cache(maxsize=None)
 def get_supported_daemons():
-    # type: () -> List[str]
-    supported_daemons = list(Ceph.daemons)
-    supported_daemons.extend(Monitoring.components)
-    supported_daemons.append(NFSGanesha.daemon_type)
-    supported_daemons.append(CephIscsi.daemon_type)
-    supported_daemons.append(CustomContainer.daemon_type)
-    supported_daemons.append(CephadmDaemon.daemon_type)
-    supported_daemons.append(HAproxy.daemon_type)
-    supported_daemons.append(Keepalived.daemon_type)
+    # type: () -> Tuple[str, ...]
+    supported_daemons = (
+        *Ceph.daemons,
+        *Monitoring.components,
+        NFSGanesha.daemon_type,
+        CephIscsi.daemon_type,
+        CustomContainer.daemon_type,
+        CephadmDaemon.daemon_type,
+        HAproxy.daemon_type,
+        Keepalived.daemon_type,
+    )
     assert len(supported_daemons) == len(set(supported_daemons))
     return supported_daemons
 
@@ -1015,8 +1138,6 @@ def attempt_bind(ctx, s, address, port):
             raise PortOccupiedError(msg)
         else:
             raise e
-    finally:
-        s.close()
 
 
 def port_in_use(ctx, port_num):
@@ -1026,8 +1147,8 @@ def port_in_use(ctx, port_num):
 
     def _port_in_use(af: socket.AddressFamily, address: str) -> bool:
         try:
-            s = socket.socket(af, socket.SOCK_STREAM)
-            attempt_bind(ctx, s, address, port_num)
+            with socket.socket(af, socket.SOCK_STREAM) as s:
+                attempt_bind(ctx, s, address, port_num)
         except PortOccupiedError:
             return True
         except OSError as e:
@@ -1039,6 +1160,18 @@ def port_in_use(ctx, port_num):
             else:
                 raise e
         return False
+
+    # a single dual-stack IPv6 socket covers both 0.0.0.0 and ::
+    try:
+        with socket.socket(socket.AF_INET6, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+            attempt_bind(ctx, s, '::', port_num)
+        return False
+    except PortOccupiedError:
+        return True
+    except OSError:
+        # no IPv6 or no dual-stack support: probe each family on its own
+        pass
     return any(_port_in_use(af, address) for af, address in (
         (socket.AF_INET, '0.0.0.0'),
         (socket.AF_INET6, '::')
@@ -1050,11 +1183,12 @@ def check_ip_port(ctx, ip, port):
     if not ctx.skip_ping_check:
         logger.info('Verifying IP %s port %d ...' % (ip, port))
         if is_ipv6(ip):
-            s = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+            af = socket.AF_INET6
             ip = unwrap_ipv6(ip)
         else:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        attempt_bind(ctx, s, ip, port)
+            af = socket.AF_INET
+        with socket.socket(af, socket.SOCK_STREAM) as s:
+            attempt_bind(ctx, s, ip, port)
 
 ##################################
 
@@ -1138,7 +1272,7 @@ class FileLock(object):
             If ``timeout`` is None, the default :attr:`~timeout` is used.
         :arg float poll_intervall:
             We check once in *poll_intervall* seconds if we can acquire the
-            file lock.
+            file lock. Only used if there is a timeout.
         :raises Timeout:
             if the lock could not be acquired in *timeout* seconds.
         .. versionchanged:: 2.0.0
@@ -1162,7 +1296,10 @@ class FileLock(object):
                 if not self.is_locked:
                     logger.debug('Acquiring lock %s on %s', lock_id,
                                  lock_filename)
-                    self._acquire()
+                    # without a timeout, block in flock() so the kernel
+                    # wakes us as soon as the lock is released instead of
+                    # polling for it
+                    self._acquire(blocking=timeout < 0)
 
                 if self.is_locked:
                     logger.debug('Lock %s acquired on %s', lock_id,
@@ -1221,12 +1358,12 @@ class FileLock(object):
         self.release(force=True)
         return None
 
-    def _acquire(self):
+    def _acquire(self, blocking=False):
         open_mode = os.O_RDWR | os.O_CREAT | os.O_TRUNC
         fd = os.open(self._lock_file, open_mode)
 
         try:
-            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
         except (IOError, OSError):
             os.close(fd)
         else:
@@ -1259,130 +1396,13 @@ class CallVerbosity(Enum):
     VERBOSE = 3
 
 
-if sys.version_info < (3, 8):
-    import itertools
-    import threading
-    import warnings
-    from asyncio import events
-
-    class ThreadedChildWatcher(asyncio.AbstractChildWatcher):
-        """Threaded child watcher implementation.
-        The watcher uses a thread per process
-        for waiting for the process finish.
-        It doesn't require subscription on POSIX signal
-        but a thread creation is not free.
-        The watcher has O(1) complexity, its performance doesn't depend
-        on amount of spawn processes.
-        """
-
-        def __init__(self):
-            self._pid_counter = itertools.count(0)
-            self._threads = {}
-
-        def is_active(self):
-            return True
-
-        def close(self):
-            self._join_threads()
-
-        def _join_threads(self):
-            """Internal: Join all non-daemon threads"""
-            threads = [thread for thread in list(self._threads.values())
-                       if thread.is_alive() and not thread.daemon]
-            for thread in threads:
-                thread.join()
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc_val, exc_tb):
-            pass
-
-        def __del__(self, _warn=warnings.warn):
-            threads = [thread for thread in list(self._threads.values())
-                       if thread.is_alive()]
-            if threads:
-                _warn(f'{self.__class__} has registered but not finished child processes',
-                      ResourceWarning,
-                      source=self)
-
-        def add_child_handler(self, pid, callback, *args):
-            loop = events.get_event_loop()
-            thread = threading.Thread(target=self._do_waitpid,
-                                      name=f'waitpid-{next(self._pid_counter)}',
-                                      args=(loop, pid, callback, args),
-                                      daemon=True)
-            self._threads[pid] = thread
-            thread.start()
-
-        def remove_child_handler(self, pid):
-            # asyncio never calls remove_child_handler() !!!
-            # The method is no-op but is implemented because
-            # abstract base classe requires it
-            return True
-
-        def attach_loop(self, loop):
-            pass
-
-        def _do_waitpid(self, loop, expected_pid, callback, args):
-            assert expected_pid > 0
-
-            try:
-                pid, status = os.waitpid(expected_pid, 0)
-            except ChildProcessError:
-                # The child process is already reaped
-                # (may happen if waitpid() is called elsewhere).
-                pid = expected_pid
-                returncode = 255
-                logger.warning(
-                    'Unknown child process pid %d, will report returncode 255',
-                    pid)
-            else:
-                if os.WIFEXITED(status):
-                    returncode = os.WEXITSTATUS(status)
-                elif os.WIFSIGNALED(status):
-                    returncode = -os.WTERMSIG(status)
-                else:
-                    raise ValueError(f'unknown wait status {status}')
-                if loop.get_debug():
-                    logger.debug('process %s exited with returncode %s',
-                                 expected_pid, returncode)
-
-            if loop.is_closed():
-                logger.warning('Loop %r that handles pid %r is closed', loop, pid)
-            else:
-                loop.call_soon_threadsafe(callback, pid, returncode, *args)
-
-            self._threads.pop(expected_pid)
-
-    # unlike SafeChildWatcher which handles SIGCHLD in the main thread,
-    # ThreadedChildWatcher runs in a separated thread, hence allows us to
-    # run create_subprocess_exec() in non-main thread, see
-    # https://bugs.python.org/issue35621
-    asyncio.set_child_watcher(ThreadedChildWatcher())
-
-
-try:
-    from asyncio import run as async_run   # type: ignore[attr-defined]
-except ImportError:
-    def async_run(coro):  # type: ignore
-        loop = asyncio.new_event_loop()
-        try:
-            asyncio.set_event_loop(loop)
-            return loop.run_until_complete(coro)
-        finally:
-            try:
-                loop.run_until_complete(loop.shutdown_asyncgens())
-            finally:
-                asyncio.set_event_loop(None)
-                loop.close()
-
-
 def call(ctx: CephadmContext,
          command: List[str],
          desc: Optional[str] = None,
          verbosity: CallVerbosity = CallVerbosity.VERBOSE_ON_FAILURE,
          timeout: Optional[int] = DEFAULT_TIMEOUT,
+         capture_stdout: bool = True,
+         capture_stderr: bool = True,
          **kwargs) -> Tuple[str, str, int]:
     """
     Wrap subprocess.Popen to
@@ -1392,8 +1412,10 @@ def call(ctx: CephadmContext,
     - cleanly return out, err, returncode
 
     :param timeout: timeout in seconds
+    :param capture_stdout: collect stdout and return it; if False, '' is
+        returned instead and the output is only logged
+    :param capture_stderr: same as capture_stdout, for stderr
     """
-
     prefix = command[0] if desc is None else desc
     if prefix:
         prefix += ': '
@@ -1401,35 +1423,48 @@ def call(ctx: CephadmContext,
 
     logger.debug('Running command: %s' % ' '.join(command))
 
-    async def tee(reader: asyncio.StreamReader) -> str:
-        collected = StringIO()
-        async for line in reader:
+    def tee(stream: IO[bytes], collected: Optional[StringIO]) -> None:
+        for line in iter(stream.readline, b''):
             message = line.decode('utf-8')
-            collected.write(message)
+            if collected is not None:
+                collected.write(message)
             if verbosity == CallVerbosity.VERBOSE:
                 logger.info(prefix + message.rstrip())
             elif verbosity != CallVerbosity.SILENT:
                 logger.debug(prefix + message.rstrip())
-        return collected.getvalue()
-
-    async def run_with_timeout() -> Tuple[str, str, int]:
-        process = await asyncio.create_subprocess_exec(
-            *command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE)
-        assert process.stdout
-        assert process.stderr
-        try:
-            stdout, stderr = await asyncio.gather(tee(process.stdout),
-                                                  tee(process.stderr))
-            returncode = await asyncio.wait_for(process.wait(), timeout)
-        except asyncio.TimeoutError:
-            logger.info(prefix + f'timeout after {timeout} seconds')
-            return '', '', 124
-        else:
-            return stdout, stderr, returncode
+        stream.close()
+
+    # nobody is going to look at the output, don't even read it
+    discard = verbosity == CallVerbosity.SILENT
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.DEVNULL if discard and not capture_stdout else subprocess.PIPE,
+        stderr=subprocess.DEVNULL if discard and not capture_stderr else subprocess.PIPE)
+    out_buf = StringIO() if capture_stdout else None
+    err_buf = StringIO() if capture_stderr else None
+    readers = [Thread(target=tee, args=(stream, buf), daemon=True)
+               for stream, buf in ((process.stdout, out_buf),
+                                   (process.stderr, err_buf))
+               if stream is not None]
+    for reader in readers:
+        reader.start()
+
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        returncode = process.wait(timeout)
+        # the timeout has to cover draining the pipes as well, otherwise a
+        # child that hands its stdout/stderr to a grandchild blocks us forever
+        for reader in readers:
+            reader.join(None if deadline is None else max(0, deadline - time.monotonic()))
+            if reader.is_alive():
+                raise subprocess.TimeoutExpired(command, timeout)
+    except subprocess.TimeoutExpired:
+        logger.info(prefix + f'timeout after {timeout} seconds')
+        process.kill()
+        return '', '', 124
 
-    stdout, stderr, returncode = async_run(run_with_timeout())
+    stdout = out_buf.getvalue() if out_buf is not None else ''
+    stderr = err_buf.getvalue() if err_buf is not None else ''
     if returncode != 0 and verbosity == CallVerbosity.VERBOSE_ON_FAILURE:
         logger.info('Non-zero exit code %d from %s',
                     returncode, ' '.join(command))
@@ -1475,11 +1510,11 @@ def call_timeout(ctx, command, timeout):
 def json_loads_retry(cli_func):
     for sleep_secs in [1, 4, 4]:
         try:
-            return json.loads(cli_func())
-        except json.JSONDecodeError:
+            return json_loads(cli_func())
+        except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError
             logger.debug('Invalid JSON. Retrying in %s seconds...' % sleep_secs)
             time.sleep(sleep_secs)
-    return json.loads(cli_func())
+    return json_loads(cli_func())
 
 
 def is_available(ctx, what, func):
@@ -1519,6 +1554,9 @@ def read_config(fn):
 
 def pathify(p):
     # type: (str) -> str
+    if p.startswith('/'):
+        # nothing to expand (only a leading ~ is) and nothing to resolve
+        return os.path.normpath(p)
     p = os.path.expanduser(p)
     return os.path.abspath(p)
 
@@ -1534,6 +1572,13 @@ def get_file_timestamp(fn):
         return None
 
 
+CONTAINER_TIMESTAMP_FRACTION_RE = re.compile(r'(\.[\d]{6})[\d]*')
+CONTAINER_TIMESTAMP_FORMATS = (
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%d %H:%M:%S.%f %z',
+)
+
+
 def try_convert_datetime(s):
     # type: (str) -> Optional[str]
     # This is super irritating because
@@ -1549,11 +1594,18 @@ def try_convert_datetime(s):
 
     # In *all* cases, the 9 digit second precision is too much for
     # python's strptime.  Shorten it to 6 digits.
-    p = re.compile(r'(\.[\d]{6})[\d]*')
-    s = p.sub(r'\1', s)
+    # Both report nanoseconds, so cut those down by slicing and only fall
+    # back to the regex for anything else.
+    dot = s.find('.')
+    frac = s[dot + 1:dot + 10]
+    if dot != -1 and len(frac) == 9 and frac.isdigit() and \
+            not s[dot + 10:dot + 11].isdigit():
+        s = s[:dot + 7] + s[dot + 10:]
+    else:
+        s = CONTAINER_TIMESTAMP_FRACTION_RE.sub(r'\1', s)
 
     # replace trailing Z with -0000, since (on python 3.6.8) it won't parse
-    if s and s[-1] == 'Z':
+    if s.endswith('Z'):
         s = s[:-1] + '-0000'
 
     # cut off the redundant 'CST' part that strptime can't parse, if
@@ -1562,11 +1614,7 @@ def try_convert_datetime(s):
     s = ' '.join(v[0:3])
 
     # try parsing with several format strings
-    fmts = [
-        '%Y-%m-%dT%H:%M:%S.%f%z',
-        '%Y-%m-%d %H:%M:%S.%f %z',
-    ]
-    for f in fmts:
+    for f in CONTAINER_TIMESTAMP_FORMATS:
         try:
             # return timestamp normalized to UTC, rendered as DATEFMT.
             return datetime.datetime.strptime(s, f).astimezone(tz=datetime.timezone.utc).strftime(DATEFMT)
@@ -1588,31 +1636,37 @@ def _parse_podman_version(version_str):
     return tuple(map(to_int, version_str.split('.')))
 
 
+@lru_cache(maxsize=1)
 def get_hostname():
     # type: () -> str
     return socket.gethostname()
 
 
+@lru_cache(maxsize=1)
 def get_fqdn():
     # type: () -> str
     return socket.getfqdn() or socket.gethostname()
 
 
+@lru_cache(maxsize=1)
 def get_arch():
     # type: () -> str
     return platform.uname().machine
 
 
+PASSWORD_ALPHABET = string.ascii_lowercase + string.digits
+
+
 def generate_service_id():
     # type: () -> str
-    return get_hostname() + '.' + ''.join(random.choice(string.ascii_lowercase)
-                                          for _ in range(6))
+    return get_hostname() + '.' + ''.join(random.choices(string.ascii_lowercase, k=6))
 
 
 def generate_password():
     # type: () -> str
-    return ''.join(random.choice(string.ascii_lowercase + string.digits)
-                   for i in range(10))
+    # this ends up as the initial dashboard password, draw it from the OS
+    # CSPRNG rather than the (seedable) module level generator
+    return ''.join(random.SystemRandom().choices(PASSWORD_ALPHABET, k=10))
 
 
 def normalize_container_id(i):
@@ -1632,13 +1686,13 @@ def make_fsid():
     return str(uuid.uuid1())
 
 
+FSID_RE = re.compile(
+    r'\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z')
+
+
 def is_fsid(s):
     # type: (str) -> bool
-    try:
-        uuid.UUID(s)
-    except ValueError:
-        return False
-    return True
+    return FSID_RE.match(s) is not None
 
 
 def infer_fsid(func):
@@ -1663,6 +1717,9 @@ def infer_fsid(func):
             elif daemon['name'] == ctx.name:
                 # ctx.name is a match
                 fsids_set.add(daemon['fsid'])
+            if len(fsids_set) > 1:
+                # ambiguous already, no need to look any further
+                break
         fsids = sorted(fsids_set)
 
         if not fsids:
@@ -1711,7 +1768,9 @@ def infer_config(func):
 
 
 def _get_default_image(ctx: CephadmContext):
-    if DEFAULT_IMAGE_IS_MASTER:
+    # only warn once per run
+    if DEFAULT_IMAGE_IS_MASTER and not getattr(ctx, '_default_image_warned', False):
+        ctx._default_image_warned = True
         warn = """This is a development version of cephadm.
 For information regarding the latest stable release:
     https://docs.ceph.com/docs/{}/cephadm/install
@@ -1774,7 +1833,9 @@ def get_last_local_ceph_image(ctx: CephadmContext, container_path: str):
 
 def _filter_last_local_ceph_image(out):
     # type: (str) -> Optional[str]
-    for image in out.splitlines():
+    # lazily iterate, we usually return on the first line
+    for line in StringIO(out):
+        image = line.rstrip('\n')
         if image and not image.endswith('@'):
             logger.info('Using recent ceph image %s' % image)
             return image
@@ -1794,12 +1855,13 @@ def write_tmp(s, uid, gid):
 
 def makedirs(dir, uid, gid, mode):
     # type: (str, int, int, int) -> None
-    if not os.path.exists(dir):
-        os.makedirs(dir, mode=mode)
-    else:
-        os.chmod(dir, mode)
-    os.chown(dir, uid, gid)
-    os.chmod(dir, mode)   # the above is masked by umask...
+    os.makedirs(dir, mode=mode, exist_ok=True)
+    # only touch the inode if ownership or mode actually need fixing
+    st = os.stat(dir)
+    if st.st_uid != uid or st.st_gid != gid:
+        os.chown(dir, uid, gid)
+    if st.st_mode & 0o7777 != mode:
+        os.chmod(dir, mode)   # the makedirs() mode is masked by umask...
 
 
 def get_data_dir(fsid, data_dir, t, n):
@@ -1855,21 +1917,89 @@ def copy_tree(ctx, src, dst, uid=None, gid=None):
     if uid is None or gid is None:
         (uid, gid) = extract_uid_gid(ctx)
 
+    debug = logger.isEnabledFor(logging.DEBUG)
+    dst_is_dir = os.path.isdir(dst)
     for src_dir in src:
         dst_dir = dst
-        if os.path.isdir(dst):
+        if dst_is_dir:
             dst_dir = os.path.join(dst, os.path.basename(src_dir))
 
-        logger.debug('copy directory `%s` -> `%s`' % (src_dir, dst_dir))
+        if debug:
+            logger.debug('copy directory `%s` -> `%s`' % (src_dir, dst_dir))
         shutil.rmtree(dst_dir, ignore_errors=True)
-        shutil.copytree(src_dir, dst_dir)  # dirs_exist_ok needs python 3.8
+        # dirs_exist_ok needs python 3.8
+        shutil.copytree(src_dir, dst_dir, copy_function=copy_file_fast)
+        # the first copy creates dst, any further trees go below it
+        dst_is_dir = True
+
+        if debug:
+            logger.debug('chown -R %s:%s `%s`' % (uid, gid, dst_dir))
+        chown_tree(dst_dir, uid, gid)
+
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), see ioctl_ficlone(2)
+
+
+def copy_file_fast(src, dst):
+    # type: (str, str) -> str
+    """
+    shutil.copy2() replacement that keeps the data in the kernel: try a
+    reflink first (btrfs/xfs), then copy_file_range(2), and only then fall
+    back to shutil.copy2()
+    """
+    if not S_ISREG(os.stat(src).st_mode):
+        return shutil.copy2(src, dst)
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                if not hasattr(os, 'copy_file_range'):  # python < 3.8
+                    raise
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining > 0:
+                    # copy_file_range() may return 0 early, e.g. across
+                    # some filesystems; never leave a short copy behind
+                    raise OSError('short copy_file_range() of %s' % src)
+    except OSError:
+        return shutil.copy2(src, dst)
+    shutil.copystat(src, dst)
+    return dst
 
-        for dirpath, dirnames, filenames in os.walk(dst_dir):
-            logger.debug('chown %s:%s `%s`' % (uid, gid, dirpath))
-            os.chown(dirpath, uid, gid)
-            for filename in filenames:
-                logger.debug('chown %s:%s `%s`' % (uid, gid, filename))
-                os.chown(os.path.join(dirpath, filename), uid, gid)
+
+def chown_tree(path, uid, gid, batch_size=256):
+    # type: (str, int, int, int) -> None
+    """
+    Recursively chown a tree. Entries that are already owned by uid:gid
+    are skipped, the rest is spread over a thread pool in per-directory
+    batches; the GIL is released during the syscalls.
+    """
+    def _chown(dfd, names):
+        # type: (int, List[str]) -> None
+        # names are resolved relative to the directory fd, not from /
+        try:
+            for n in names:
+                st = os.stat(n, dir_fd=dfd, follow_symlinks=False)
+                if st.st_uid != uid or st.st_gid != gid:
+                    os.chown(n, uid, gid, dir_fd=dfd, follow_symlinks=False)
+        finally:
+            os.close(dfd)
+
+    with ThreadPoolExecutor() as executor:
+        futures = []
+        for dirpath, dirnames, filenames, dfd in os.fwalk(path):
+            # fwalk closes dfd once it moves on, hand each batch its own fd
+            names = ['.'] + filenames
+            for i in range(0, len(names), batch_size):
+                futures.append(executor.submit(_chown, os.dup(dfd),
+                                               names[i:i + batch_size]))
+        for future in futures:
+            future.result()
 
 
 def copy_files(ctx, src, dst, uid=None, gid=None):
@@ -1880,15 +2010,19 @@ def copy_files(ctx, src, dst, uid=None, gid=None):
     if uid is None or gid is None:
         (uid, gid) = extract_uid_gid(ctx)
 
+    debug = logger.isEnabledFor(logging.DEBUG)
+    dst_is_dir = os.path.isdir(dst)
     for src_file in src:
         dst_file = dst
-        if os.path.isdir(dst):
+        if dst_is_dir:
             dst_file = os.path.join(dst, os.path.basename(src_file))
 
-        logger.debug('copy file `%s` -> `%s`' % (src_file, dst_file))
+        if debug:
+            logger.debug('copy file `%s` -> `%s`' % (src_file, dst_file))
         shutil.copyfile(src_file, dst_file)
 
-        logger.debug('chown %s:%s `%s`' % (uid, gid, dst_file))
+        if debug:
+            logger.debug('chown %s:%s `%s`' % (uid, gid, dst_file))
         os.chown(dst_file, uid, gid)
 
 
@@ -1900,21 +2034,26 @@ def move_files(ctx, src, dst, uid=None, gid=None):
     if uid is None or gid is None:
         (uid, gid) = extract_uid_gid(ctx)
 
+    debug = logger.isEnabledFor(logging.DEBUG)
+    dst_is_dir = os.path.isdir(dst)
     for src_file in src:
         dst_file = dst
-        if os.path.isdir(dst):
+        if dst_is_dir:
             dst_file = os.path.join(dst, os.path.basename(src_file))
 
         if os.path.islink(src_file):
             # shutil.move() in py2 does not handle symlinks correctly
             src_rl = os.readlink(src_file)
-            logger.debug("symlink '%s' -> '%s'" % (dst_file, src_rl))
+            if debug:
+                logger.debug("symlink '%s' -> '%s'" % (dst_file, src_rl))
             os.symlink(src_rl, dst_file)
             os.unlink(src_file)
         else:
-            logger.debug("move file '%s' -> '%s'" % (src_file, dst_file))
+            if debug:
+                logger.debug("move file '%s' -> '%s'" % (src_file, dst_file))
             shutil.move(src_file, dst_file)
-            logger.debug('chown %s:%s `%s`' % (uid, gid, dst_file))
+            if debug:
+                logger.debug('chown %s:%s `%s`' % (uid, gid, dst_file))
             os.chown(dst_file, uid, gid)
 
 
@@ -1924,13 +2063,6 @@ def find_executable(executable, path=None):
     A string listing directories separated by 'os.pathsep'; defaults to
     os.environ['PATH'].  Returns the complete filename or None if not found.
     """
-    _, ext = os.path.splitext(executable)
-    if (sys.platform == 'win32') and (ext != '.exe'):
-        executable = executable + '.exe'
-
-    if os.path.isfile(executable):
-        return executable
-
     if path is None:
         path = os.environ.get('PATH', None)
         if path is None:
@@ -1941,20 +2073,67 @@ def find_executable(executable, path=None):
                 path = os.defpath
         # bpo-35755: Don't use os.defpath if the PATH environment variable is
         # set to an empty string
+    # keyed on the resolved PATH, so a changed environment is not served
+    # stale results
+    return _find_executable(executable, path)
+
+
+@lru_cache(maxsize=1)
+def _path_dirs(path):
+    # type: (str) -> Tuple[str, ...]
+    """split PATH once into prefixes that only need the file name appended"""
+    return tuple(p if not p or p.endswith(os.sep) else p + os.sep
+                 for p in path.split(os.pathsep))
+
+
+# successful lookups only: a missing program may get installed later on
+# (e.g. lvm2 by prepare-host) and must be found on the next lookup
+_executable_cache = {}  # type: Dict[Tuple[str, Optional[str]], str]
+
+
+def _find_executable(executable, path):
+    # type: (str, Optional[str]) -> Optional[str]
+    key = (executable, path)
+    found = _executable_cache.get(key)
+    if found is None:
+        found = _lookup_executable(executable, path)
+        if found is not None:
+            _executable_cache[key] = found
+    return found
+
+
+def _lookup_executable(executable, path):
+    # type: (str, Optional[str]) -> Optional[str]
+    _, ext = os.path.splitext(executable)
+    if (sys.platform == 'win32') and (ext != '.exe'):
+        executable = executable + '.exe'
+
+    if _is_executable_file(executable):
+        return executable
 
     # PATH='' doesn't match, whereas PATH=':' looks in the current directory
     if not path:
         return None
 
-    paths = path.split(os.pathsep)
-    for p in paths:
-        f = os.path.join(p, executable)
-        if os.path.isfile(f):
+    for p in _path_dirs(path):
+        f = p + executable
+        if _is_executable_file(f):
             # the file exists, we have a shot at spawn working
             return f
     return None
 
 
+def _is_executable_file(path):
+    # type: (str) -> bool
+    # a single stat() answers both "regular file?" and "executable?", so
+    # non-executable PATH entries are skipped without extra syscalls
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return False
+    return S_ISREG(mode) and bool(mode & 0o111)
+
+
 def find_program(filename):
     # type: (str) -> str
     name = find_executable(filename)
@@ -1964,6 +2143,9 @@ def find_program(filename):
 
 
 def find_container_engine(ctx: CephadmContext):
+    if ctx.container_engine is not None:
+        # already located, don't probe PATH again
+        return ctx.container_engine
     if ctx.docker:
         return Docker()
     else:
@@ -1989,12 +2171,12 @@ def check_container_engine(ctx):
 def get_unit_name(fsid, daemon_type, daemon_id=None):
     # type: (str, str, Optional[Union[int, str]]) -> str
     # accept either name or type + id
-    if daemon_type == CephadmDaemon.daemon_type and daemon_id is not None:
-        return 'ceph-%s-%s.%s' % (fsid, daemon_type, daemon_id)
-    elif daemon_id is not None:
-        return 'ceph-%s@%s.%s' % (fsid, daemon_type, daemon_id)
+    if daemon_id is None:
+        return f'ceph-{fsid}@{daemon_type}'
+    elif daemon_type == CephadmDaemon.daemon_type:
+        return f'ceph-{fsid}-{daemon_type}.{daemon_id}'
     else:
-        return 'ceph-%s@%s' % (fsid, daemon_type)
+        return f'ceph-{fsid}@{daemon_type}.{daemon_id}'
 
 
 def get_unit_name_by_daemon_name(ctx: CephadmContext, fsid, name):
@@ -2005,49 +2187,71 @@ def get_unit_name_by_daemon_name(ctx: CephadmContext, fsid, name):
         raise Error('Failed to get unit name for {}'.format(daemon))
 
 
-def check_unit(ctx, unit_name):
-    # type: (CephadmContext, str) -> Tuple[bool, str, bool]
+# UnitFileState values for which `systemctl is-enabled` exits 0
+SYSTEMD_ENABLED_STATES = frozenset([
+    'enabled', 'enabled-runtime', 'static', 'indirect', 'generated',
+    'transient', 'alias',
+])
+
+
+def _unit_state(props):
+    # type: (Dict[str, str]) -> Tuple[bool, str, bool]
+    file_state = props.get('UnitFileState', '')
+    enabled = file_state in SYSTEMD_ENABLED_STATES
+    installed = enabled or file_state == 'disabled'
+
+    active = props.get('ActiveState', '')
+    if active == 'active':
+        state = 'running'
+    elif active == 'inactive':
+        state = 'stopped'
+    elif active == 'failed' or props.get('SubState') == 'auto-restart':
+        state = 'error'
+    else:
+        state = 'unknown'
+    return (enabled, state, installed)
+
+
+def get_unit_states(ctx, units):
+    # type: (CephadmContext, List[str]) -> Dict[str, Tuple[bool, str, bool]]
+    """
+    Query enabled/active state of all `units` with a single `systemctl show`
+    instead of an is-enabled + is-active pair per unit.
+    """
     # NOTE: we ignore the exit code here because systemctl outputs
     # various exit codes based on the state of the service, but the
     # string result is more explicit (and sufficient).
-    enabled = False
-    installed = False
     try:
-        out, err, code = call(ctx, ['systemctl', 'is-enabled', unit_name],
+        out, err, code = call(ctx,
+                              ['systemctl', 'show',
+                               '--property=UnitFileState,ActiveState,SubState',
+                               '--'] + list(units),
                               verbosity=CallVerbosity.DEBUG)
-        if code == 0:
-            enabled = True
-            installed = True
-        elif 'disabled' in out:
-            installed = True
     except Exception as e:
         logger.warning('unable to run systemctl: %s' % e)
-        enabled = False
-        installed = False
+        out = ''
 
-    state = 'unknown'
-    try:
-        out, err, code = call(ctx, ['systemctl', 'is-active', unit_name],
-                              verbosity=CallVerbosity.DEBUG)
-        out = out.strip()
-        if out in ['active']:
-            state = 'running'
-        elif out in ['inactive']:
-            state = 'stopped'
-        elif out in ['failed', 'auto-restart']:
-            state = 'error'
-        else:
-            state = 'unknown'
-    except Exception as e:
-        logger.warning('unable to run systemctl: %s' % e)
-        state = 'unknown'
-    return (enabled, state, installed)
+    # one blank-line separated block of key=value lines per unit, in order
+    blocks = [b for b in out.strip().split('\n\n') if b]
+    if len(blocks) != len(units):
+        return {u: (False, 'unknown', False) for u in units}
+    states = {}
+    for unit, block in zip(units, blocks):
+        props = dict(line.partition('=')[::2] for line in block.splitlines())
+        states[unit] = _unit_state(props)
+    return states
+
+
+def check_unit(ctx, unit_name):
+    # type: (CephadmContext, str) -> Tuple[bool, str, bool]
+    return get_unit_states(ctx, [unit_name])[unit_name]
 
 
 def check_units(ctx, units, enabler=None):
     # type: (CephadmContext, List[str], Optional[Packager]) -> bool
+    states = get_unit_states(ctx, units)
     for u in units:
-        (enabled, state, installed) = check_unit(ctx, u)
+        (enabled, state, installed) = states[u]
         if enabled and state == 'running':
             logger.info('Unit %s is enabled and running' % u)
             return True
@@ -2058,7 +2262,50 @@ def check_units(ctx, units, enabler=None):
     return False
 
 
+class UnixHTTPConnection(HTTPConnection):
+    """HTTPConnection to a local unix domain socket"""
+
+    def __init__(self, path: str, timeout: Optional[float] = None) -> None:
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def inspect_container_via_socket(ctx: CephadmContext, name: str) -> Optional[Dict[str, Any]]:
+    """
+    Inspect a container through the engine's REST API socket (docker compat
+    endpoint, also served by podman) instead of forking the engine binary.
+    Returns {} if the container does not exist and None if the API could
+    not be used.
+    """
+    path = getattr(ctx.container_engine, 'API_SOCKET', None)
+    if not path or not os.path.exists(path):
+        return None
+    conn = UnixHTTPConnection(path, timeout=5)
+    try:
+        conn.request('GET', '/containers/%s/json' % quote(name, safe=''))
+        resp = conn.getresponse()
+        body = resp.read()
+        if resp.status == 404:
+            return {}
+        if resp.status != 200:
+            return None
+        return json_loads(body)
+    except (OSError, HTTPException, ValueError) as e:
+        logger.debug('container API query for %s failed: %s' % (name, e))
+        return None
+    finally:
+        conn.close()
+
+
 def is_container_running(ctx: CephadmContext, name: str) -> bool:
+    info = inspect_container_via_socket(ctx, name)
+    if info is not None:
+        return info.get('State', {}).get('Status') == 'running'
     out, err, ret = call(ctx, [
         ctx.container_engine.path, 'container', 'inspect',
         '--format', '{{.State.Status}}', name
@@ -2071,11 +2318,16 @@ def get_legacy_config_fsid(cluster, legacy_dir=None):
     config_file = '/etc/ceph/%s.conf' % cluster
     if legacy_dir is not None:
         config_file = os.path.abspath(legacy_dir + config_file)
+    return _read_legacy_config_fsid(config_file)
+
 
-    if os.path.exists(config_file):
-        config = read_config(config_file)
-        if config.has_section('global') and config.has_option('global', 'fsid'):
-            return config.get('global', 'fsid')
+@lru_cache(maxsize=16)
+def _read_legacy_config_fsid(config_file):
+    # type: (str) -> Optional[str]
+    # ConfigParser.read() skips missing files, no need to stat first
+    config = read_config(config_file)
+    if config.has_section('global') and config.has_option('global', 'fsid'):
+        return config.get('global', 'fsid')
     return None
 
 
@@ -2103,8 +2355,51 @@ def get_legacy_daemon_fsid(ctx, cluster,
 def should_log_to_journald(ctx):
     if ctx.log_to_journald is not None:
         return ctx.log_to_journald
-    return isinstance(ctx.container_engine, Podman) and \
+    # the engine (and its version) is fixed for the lifetime of ctx
+    cached = getattr(ctx, '_journald_cached', None)
+    if cached is not None:
+        return cached
+    result = isinstance(ctx.container_engine, Podman) and \
         ctx.container_engine.version >= CGROUPS_SPLIT_PODMAN_VERSION
+    ctx._journald_cached = result
+    return result
+
+
+# ceph daemon args, indexed by should_log_to_journald()
+CEPH_DAEMON_ARGS = (
+    (
+        '--setuser', 'ceph',
+        '--setgroup', 'ceph',
+        '--default-log-to-file=false',
+        '--default-log-to-stderr=true',
+        '--default-log-stderr-prefix=debug ',
+    ),
+    (
+        '--setuser', 'ceph',
+        '--setgroup', 'ceph',
+        '--default-log-to-file=false',
+        '--default-log-to-journald=true',
+        '--default-log-to-stderr=false',
+    ),
+)
+CEPH_MON_ARGS = (
+    (
+        '--default-mon-cluster-log-to-file=false',
+        '--default-mon-cluster-log-to-stderr=true',
+    ),
+    (
+        '--default-mon-cluster-log-to-file=false',
+        '--default-mon-cluster-log-to-journald=true',
+        '--default-mon-cluster-log-to-stderr=false',
+    ),
+)
+
+
+@lru_cache(maxsize=8)
+def _parse_meta_json(meta_json):
+    # type: (str) -> Dict[str, Any]
+    # shared between callers, do not modify the result
+    return json.loads(meta_json) or {}
 
 
 def get_daemon_args(ctx, fsid, daemon_type, daemon_id):
@@ -2112,42 +2407,19 @@ def get_daemon_args(ctx, fsid, daemon_type, daemon_id):
     r = list()  # type: List[str]
 
     if daemon_type in Ceph.daemons and daemon_type != 'crash':
-        r += [
-            '--setuser', 'ceph',
-            '--setgroup', 'ceph',
-            '--default-log-to-file=false',
-        ]
-        log_to_journald = should_log_to_journald(ctx)
-        if log_to_journald:
-            r += [
-                '--default-log-to-journald=true',
-                '--default-log-to-stderr=false',
-            ]
-        else:
-            r += [
-                '--default-log-to-stderr=true',
-                '--default-log-stderr-prefix=debug ',
-            ]
+        log_to_journald = bool(should_log_to_journald(ctx))
+        r += CEPH_DAEMON_ARGS[log_to_journald]
         if daemon_type == 'mon':
-            r += [
-                '--default-mon-cluster-log-to-file=false',
-            ]
-            if log_to_journald:
-                r += [
-                    '--default-mon-cluster-log-to-journald=true',
-                    '--default-mon-cluster-log-to-stderr=false',
-                ]
-            else:
-                r += ['--default-mon-cluster-log-to-stderr=true']
+            r += CEPH_MON_ARGS[log_to_journald]
     elif daemon_type in Monitoring.components:
         metadata = Monitoring.components[daemon_type]
-        r += metadata.get('args', list())
+        r += metadata.get('args', ())
         # set ip and port to bind to for nodeexporter,alertmanager,prometheus
         if daemon_type != 'grafana':
             ip = ''
             port = Monitoring.port_map[daemon_type][0]
             if 'meta_json' in ctx and ctx.meta_json:
-                meta = json.loads(ctx.meta_json) or {}
+                meta = _parse_meta_json(ctx.meta_json)
                 if 'ip' in meta and meta['ip']:
                     ip = meta['ip']
                 if 'ports' in meta and meta['ports']:
@@ -2179,61 +2451,38 @@ def create_daemon_dirs(ctx, fsid, daemon_type, daemon_id, uid, gid,
     data_dir = make_data_dir(ctx, fsid, daemon_type, daemon_id, uid=uid, gid=gid)
     make_log_dir(ctx, fsid, uid=uid, gid=gid)
 
+    payloads = []
     if config:
-        config_path = os.path.join(data_dir, 'config')
-        with open(config_path, 'w') as f:
-            os.fchown(f.fileno(), uid, gid)
-            os.fchmod(f.fileno(), 0o600)
-            f.write(config)
-
+        payloads.append(('config', config.encode('utf-8')))
     if keyring:
-        keyring_path = os.path.join(data_dir, 'keyring')
-        with open(keyring_path, 'w') as f:
-            os.fchmod(f.fileno(), 0o600)
-            os.fchown(f.fileno(), uid, gid)
-            f.write(keyring)
+        payloads.append(('keyring', keyring.encode('utf-8')))
+    write_files(data_dir, payloads, uid, gid)
 
     if daemon_type in Monitoring.components.keys():
         config_json: Dict[str, Any] = get_parm(ctx.config_json)
 
         # Set up directories specific to the monitoring component
         config_dir = ''
-        data_dir_root = ''
-        if daemon_type == 'prometheus':
-            data_dir_root = get_data_dir(fsid, ctx.data_dir,
-                                         daemon_type, daemon_id)
-            config_dir = 'etc/prometheus'
-            makedirs(os.path.join(data_dir_root, config_dir), uid, gid, 0o755)
-            makedirs(os.path.join(data_dir_root, config_dir, 'alerting'), uid, gid, 0o755)
-            makedirs(os.path.join(data_dir_root, 'data'), uid, gid, 0o755)
-        elif daemon_type == 'grafana':
-            data_dir_root = get_data_dir(fsid, ctx.data_dir,
-                                         daemon_type, daemon_id)
-            config_dir = 'etc/grafana'
-            makedirs(os.path.join(data_dir_root, config_dir), uid, gid, 0o755)
-            makedirs(os.path.join(data_dir_root, config_dir, 'certs'), uid, gid, 0o755)
-            makedirs(os.path.join(data_dir_root, config_dir, 'provisioning/datasources'), uid, gid, 0o755)
-            makedirs(os.path.join(data_dir_root, 'data'), uid, gid, 0o755)
-            touch(os.path.join(data_dir_root, 'data', 'grafana.db'), uid, gid)
-        elif daemon_type == 'alertmanager':
-            data_dir_root = get_data_dir(fsid, ctx.data_dir,
-                                         daemon_type, daemon_id)
-            config_dir = 'etc/alertmanager'
-            makedirs(os.path.join(data_dir_root, config_dir), uid, gid, 0o755)
-            makedirs(os.path.join(data_dir_root, config_dir, 'data'), uid, gid, 0o755)
-
-        # populate the config directory for the component from the config-json
+        dirs = Monitoring.components[daemon_type].get('dirs', ())
+        if dirs:
+            config_dir = dirs[0]
+            for d in dirs:
+                makedirs(os.path.join(data_dir, d), uid, gid, 0o755)
+        if daemon_type == 'grafana':
+            touch(os.path.join(data_dir, 'data', 'grafana.db'), uid, gid)
+
+        # populate the config directory for the component from the config-json;
+        # paths are relative to the data dir so they can be opened off its fd
         if 'files' in config_json:
+            payloads = []
             for fname in config_json['files']:
                 content = dict_get_join(config_json['files'], fname)
                 if os.path.isabs(fname):
-                    fpath = os.path.join(data_dir_root, fname.lstrip(os.path.sep))
+                    fpath = fname.lstrip(os.path.sep)
                 else:
-                    fpath = os.path.join(data_dir_root, config_dir, fname)
-                with open(fpath, 'w', encoding='utf-8') as f:
-                    os.fchown(f.fileno(), uid, gid)
-                    os.fchmod(f.fileno(), 0o600)
-                    f.write(content)
+                    fpath = os.path.join(config_dir, fname)
+                payloads.append((fpath, content.encode('utf-8')))
+            write_files(data_dir, payloads, uid, gid)
 
     elif daemon_type == NFSGanesha.daemon_type:
         nfs_ganesha = NFSGanesha.init(ctx, fsid, daemon_id)
@@ -2256,6 +2505,12 @@ def create_daemon_dirs(ctx, fsid, daemon_type, daemon_id, uid, gid,
         cc.create_daemon_dirs(data_dir, uid, gid)
 
 
+# parsed --config-json/--registry-json values, keyed on the option (or on
+# the stdin contents for '-'). Callers get a deep copy, as some of them
+# (e.g. CustomContainer) rewrite nested values in place.
+_parm_cache = {}  # type: Dict[str, Dict[str, str]]
+
+
 def get_parm(option):
     # type: (str) -> Dict[str, str]
 
@@ -2269,7 +2524,13 @@ def get_parm(option):
         else:
             j = sys.stdin.read()
             cached_stdin = j
+        key = j
     else:
+        key = option
+    if key in _parm_cache:
+        return copy.deepcopy(_parm_cache[key])
+
+    if option != '-':
         # inline json string
         if option[0] == '{' and option[-1] == '}':
             j = option
@@ -2285,7 +2546,8 @@ def get_parm(option):
     except ValueError as e:
         raise Error('Invalid JSON in {}: {}'.format(option, e))
     else:
-        return js
+        _parm_cache[key] = js
+        return copy.deepcopy(js)
 
 
 def get_config_and_keyring(ctx):
@@ -2332,6 +2594,23 @@ def get_container_binds(ctx, fsid, daemon_type, daemon_id):
     return binds
 
 
+# host device mounts, by daemon type
+HOST_DEVICE_MOUNTS = {
+    'mon': (
+        ('/dev', '/dev'),  # FIXME: narrow this down?
+        ('/run/udev', '/run/udev'),
+    ),
+    'osd': (
+        ('/dev', '/dev'),
+        ('/run/udev', '/run/udev'),
+        ('/sys', '/sys'),  # for numa.cc, pick_address, cgroups, ...
+        ('/run/lvm', '/run/lvm'),
+        ('/run/lock/lvm', '/run/lock/lvm'),
+    ),
+}
+HOST_DEVICE_MOUNTS['clusterless-ceph-volume'] = HOST_DEVICE_MOUNTS['osd']
+
+
 def get_container_mounts(ctx, fsid, daemon_type, daemon_id,
                          no_config=False):
     # type: (CephadmContext, str, str, Union[int, str, None], Optional[bool]) -> Dict[str, str]
@@ -2365,16 +2644,10 @@ def get_container_mounts(ctx, fsid, daemon_type, daemon_id,
             # these do not search for their keyrings in a data directory
             mounts[data_dir + '/keyring'] = '/etc/ceph/ceph.client.%s.%s.keyring' % (daemon_type, daemon_id)
 
-    if daemon_type in ['mon', 'osd', 'clusterless-ceph-volume']:
-        mounts['/dev'] = '/dev'  # FIXME: narrow this down?
-        mounts['/run/udev'] = '/run/udev'
-    if daemon_type in ['osd', 'clusterless-ceph-volume']:
-        mounts['/sys'] = '/sys'  # for numa.cc, pick_address, cgroups, ...
-        mounts['/run/lvm'] = '/run/lvm'
-        mounts['/run/lock/lvm'] = '/run/lock/lvm'
+    mounts.update(HOST_DEVICE_MOUNTS.get(daemon_type, ()))
     if daemon_type == 'osd':
         # selinux-policy in the container may not match the host.
-        if HostFacts(ctx).selinux_enabled:
+        if host_selinux_enabled(ctx):
             selinux_folder = '/var/lib/ceph/%s/selinux' % fsid
             if not os.path.exists(selinux_folder):
                 os.makedirs(selinux_folder, mode=0o755)
@@ -2398,20 +2671,10 @@ def get_container_mounts(ctx, fsid, daemon_type, daemon_id,
 
     if daemon_type in Monitoring.components and daemon_id:
         data_dir = get_data_dir(fsid, ctx.data_dir, daemon_type, daemon_id)
-        if daemon_type == 'prometheus':
-            mounts[os.path.join(data_dir, 'etc/prometheus')] = '/etc/prometheus:Z'
-            mounts[os.path.join(data_dir, 'data')] = '/prometheus:Z'
-        elif daemon_type == 'node-exporter':
-            mounts['/proc'] = '/host/proc:ro'
-            mounts['/sys'] = '/host/sys:ro'
-            mounts['/'] = '/rootfs:ro'
-        elif daemon_type == 'grafana':
-            mounts[os.path.join(data_dir, 'etc/grafana/grafana.ini')] = '/etc/grafana/grafana.ini:Z'
-            mounts[os.path.join(data_dir, 'etc/grafana/provisioning/datasources')] = '/etc/grafana/provisioning/datasources:Z'
-            mounts[os.path.join(data_dir, 'etc/grafana/certs')] = '/etc/grafana/certs:Z'
-            mounts[os.path.join(data_dir, 'data/grafana.db')] = '/var/lib/grafana/grafana.db:Z'
-        elif daemon_type == 'alertmanager':
-            mounts[os.path.join(data_dir, 'etc/alertmanager')] = '/etc/alertmanager:Z'
+        # host paths are relative to the data dir; absolute ones (node-exporter)
+        # are left alone by os.path.join()
+        for host_path, container_path in Monitoring.components[daemon_type]['mounts']:
+            mounts[os.path.join(data_dir, host_path)] = container_path
 
     if daemon_type == NFSGanesha.daemon_type:
         assert daemon_id
@@ -2544,16 +2807,28 @@ def get_container(ctx: CephadmContext,
     )
 
 
+# uid/gid per (image, paths), see extract_uid_gid()
+_uid_gid_cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[int, int]] = {}
+
+
 def extract_uid_gid(ctx, img='', file_path='/var/lib/ceph'):
     # type: (CephadmContext, str, Union[str, List[str]]) -> Tuple[int, int]
-
+    """
+    Owner of file_path (the first one that exists) inside img. Starting a
+    container is expensive and the result is fixed for a given image, so
+    it is cached.
+    """
     if not img:
         img = ctx.image
 
     if isinstance(file_path, str):
-        paths = [file_path]
+        paths = (file_path,)
     else:
-        paths = file_path
+        paths = tuple(file_path)
+
+    key = (img, paths)
+    if key in _uid_gid_cache:
+        return _uid_gid_cache[key]
 
     for fp in paths:
         try:
@@ -2564,7 +2839,8 @@ def extract_uid_gid(ctx, img='', file_path='/var/lib/ceph'):
                 args=['-c', '%u %g', fp]
             ).run()
             uid, gid = out.split(' ')
-            return int(uid), int(gid)
+            _uid_gid_cache[key] = (int(uid), int(gid))
+            return _uid_gid_cache[key]
         except RuntimeError:
             pass
     raise RuntimeError('uid/gid not found')
@@ -2578,7 +2854,7 @@ def deploy_daemon(ctx, fsid, daemon_type, daemon_id, c, uid, gid,
     # type: (CephadmContext, str, str, Union[int, str], Optional[CephContainer], int, int, Optional[str], Optional[str], Optional[str], Optional[bool], Optional[List[int]]) -> None
 
     ports = ports or []
-    if any([port_in_use(ctx, port) for port in ports]):
+    if any(port_in_use(ctx, port) for port in ports):
         if daemon_type == 'mgr':
             # non-fatal for mgr when we are in mgr_standby_modules=false, but we can't
             # tell whether that is the case here.
@@ -2655,8 +2931,14 @@ def deploy_daemon(ctx, fsid, daemon_type, daemon_id, c, uid, gid,
             else:
                 raise RuntimeError('attempting to deploy a daemon without a container image')
 
-    if not os.path.exists(data_dir + '/unit.created'):
-        with open(data_dir + '/unit.created', 'w') as f:
+    # O_EXCL: create it only once, without a separate exists() probe
+    try:
+        fd = os.open(data_dir + '/unit.created',
+                     os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, 'w') as f:
             os.fchmod(f.fileno(), 0o600)
             os.fchown(f.fileno(), uid, gid)
             f.write('mtime is time the daemon deployment was created\n')
@@ -2666,13 +2948,13 @@ def deploy_daemon(ctx, fsid, daemon_type, daemon_id, c, uid, gid,
         os.fchmod(f.fileno(), 0o600)
         os.fchown(f.fileno(), uid, gid)
 
-    update_firewalld(ctx, daemon_type)
-
+    fw = Firewalld(ctx)
+    fw.enable_service_for(daemon_type)
     # Open ports explicitly required for the daemon
     if ports:
-        fw = Firewalld(ctx)
         fw.open_ports(ports)
-        fw.apply_rules()
+    # a single --reload for both
+    fw.apply_rules()
 
     if reconfig and daemon_type not in Ceph.daemons:
         # ceph daemons do not need a restart; others (presumably) do to pick
@@ -2704,6 +2986,35 @@ def _write_container_cmd_to_bash(ctx, file_obj, container, comment=None, backgro
         + (' &' if background else '') + '\n')
 
 
+@contextmanager
+def write_new(path, perms=0o600):
+    # type: (str, Optional[int]) -> Iterator[IO[str]]
+    """
+    Write a file atomically: the content goes to `path`.new, which is
+    fsync()ed and then renamed over `path`; the directory is fsync()ed
+    too so the rename survives a crash. A crash never leaves a truncated
+    `path` behind.
+    """
+    tmp = path + '.new'
+    try:
+        with open(tmp, 'w') as f:
+            if perms is not None:
+                os.fchmod(f.fileno(), perms)
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    dir_fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
 def deploy_daemon_units(
     ctx: CephadmContext,
     fsid: str,
@@ -2719,8 +3030,8 @@ def deploy_daemon_units(
 ) -> None:
     # cmd
     data_dir = get_data_dir(fsid, ctx.data_dir, daemon_type, daemon_id)
-    with open(data_dir + '/unit.run.new', 'w') as f, \
-            open(data_dir + '/unit.meta.new', 'w') as metaf:
+    with write_new(data_dir + '/unit.run') as f, \
+            write_new(data_dir + '/unit.meta') as metaf:
         f.write('set -e\n')
 
         if daemon_type in Ceph.daemons:
@@ -2776,15 +3087,8 @@ def deploy_daemon_units(
             meta['ports'] = ports
         metaf.write(json.dumps(meta, indent=4) + '\n')
 
-        os.fchmod(f.fileno(), 0o600)
-        os.fchmod(metaf.fileno(), 0o600)
-        os.rename(data_dir + '/unit.run.new',
-                  data_dir + '/unit.run')
-        os.rename(data_dir + '/unit.meta.new',
-                  data_dir + '/unit.meta')
-
     # post-stop command(s)
-    with open(data_dir + '/unit.poststop.new', 'w') as f:
+    with write_new(data_dir + '/unit.poststop') as f:
         if daemon_type == 'osd':
             assert osd_fsid
             poststop = CephContainer(
@@ -2808,38 +3112,55 @@ def deploy_daemon_units(
             tcmu_container = ceph_iscsi.get_tcmu_runner_container()
             f.write('! ' + ' '.join(tcmu_container.stop_cmd()) + '\n')
             f.write(' '.join(CephIscsi.configfs_mount_umount(data_dir, mount=False)) + '\n')
-        os.fchmod(f.fileno(), 0o600)
-        os.rename(data_dir + '/unit.poststop.new',
-                  data_dir + '/unit.poststop')
 
     if c:
-        with open(data_dir + '/unit.image.new', 'w') as f:
+        with write_new(data_dir + '/unit.image') as f:
             f.write(c.image + '\n')
-            os.fchmod(f.fileno(), 0o600)
-            os.rename(data_dir + '/unit.image.new',
-                      data_dir + '/unit.image')
-
-    # sysctl
-    install_sysctl(ctx, fsid, daemon_type)
-
-    # systemd
-    install_base_units(ctx, fsid)
-    unit = get_unit_file(ctx, fsid)
-    unit_file = 'ceph-%s@.service' % (fsid)
-    with open(ctx.unit_dir + '/' + unit_file + '.new', 'w') as f:
-        f.write(unit)
-        os.rename(ctx.unit_dir + '/' + unit_file + '.new',
-                  ctx.unit_dir + '/' + unit_file)
-    call_throws(ctx, ['systemctl', 'daemon-reload'])
 
     unit_name = get_unit_name(fsid, daemon_type, daemon_id)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # sysctl: `sysctl --system` is independent of the unit file setup
+        # below, it only has to succeed before the daemon is stopped
+        sysctl = executor.submit(install_sysctl, ctx, fsid, daemon_type)
+
+        # systemd
+        install_base_units(ctx, fsid)
+        unit = get_unit_file(ctx, fsid)
+        unit_path = ctx.unit_dir + '/ceph-%s@.service' % (fsid)
+        try:
+            with open(unit_path, 'r') as f:
+                unit_changed = f.read() != unit
+        except FileNotFoundError:
+            unit_changed = True
+        # the template unit is shared by all daemons of the cluster, only
+        # the first deploy (or an engine change) needs a daemon-reload
+        if unit_changed:
+            with write_new(unit_path, perms=None) as f:
+                f.write(unit)
+            need_reload = True
+        else:
+            # an earlier run may have died between writing the unit and
+            # reloading systemd; ask systemd whether its copy is stale
+            out, _, _ = call(ctx, ['systemctl', 'show', '--property=NeedDaemonReload', unit_name],
+                             verbosity=CallVerbosity.DEBUG)
+            need_reload = out.strip() != 'NeedDaemonReload=no'
+        if need_reload:
+            call_throws(ctx, ['systemctl', 'daemon-reload'])
+
+        # a sysctl failure must abort before the running daemon is touched
+        sysctl.result()
+
     call(ctx, ['systemctl', 'stop', unit_name],
-         verbosity=CallVerbosity.DEBUG)
+         verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
     call(ctx, ['systemctl', 'reset-failed', unit_name],
-         verbosity=CallVerbosity.DEBUG)
-    if enable:
+         verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
+
+    if enable and start:
+        # one systemctl run (and one PID1 round trip) instead of two
+        call_throws(ctx, ['systemctl', 'enable', '--now', unit_name])
+    elif enable:
         call_throws(ctx, ['systemctl', 'enable', unit_name])
-    if start:
+    elif start:
         call_throws(ctx, ['systemctl', 'start', unit_name])
 
 
@@ -2848,8 +3169,21 @@ class Firewalld(object):
         # type: (CephadmContext) -> None
         self.ctx = ctx
         self.available = self.check()
+        # whether the permanent config was changed and needs a --reload
+        self.changed = False
 
     def check(self):
+        # type: () -> bool
+        # the binary and the state of firewalld.service don't change while
+        # we run; deploy creates several Firewalld()s, only probe once
+        cached = getattr(self.ctx, '_firewalld_check', None)
+        if cached is None:
+            cached = (self._check(), self.cmd)
+            self.ctx._firewalld_check = cached
+        available, self.cmd = cached
+        return available
+
+    def _check(self):
         # type: () -> bool
         self.cmd = find_executable('firewall-cmd')
         if not self.cmd:
@@ -2891,6 +3225,7 @@ class Firewalld(object):
             if ret:
                 raise RuntimeError(
                     'unable to add service %s to current zone: %s' % (svc, err))
+            self.changed = True
         else:
             logger.debug('firewalld service %s is enabled in current zone' % svc)
 
@@ -2903,17 +3238,23 @@ class Firewalld(object):
         if not self.cmd:
             raise RuntimeError('command not defined')
 
-        for port in fw_ports:
-            tcp_port = str(port) + '/tcp'
-            out, err, ret = call(self.ctx, [self.cmd, '--permanent', '--query-port', tcp_port], verbosity=CallVerbosity.DEBUG)
-            if ret:
+        enabled = self._permanent_ports()
+        to_add = []  # type: List[str]
+        for tcp_port in [f'{p}/tcp' for p in fw_ports]:
+            if tcp_port not in enabled:
                 logger.info('Enabling firewalld port %s in current zone...' % tcp_port)
-                out, err, ret = call(self.ctx, [self.cmd, '--permanent', '--add-port', tcp_port])
-                if ret:
-                    raise RuntimeError('unable to add port %s to current zone: %s' %
-                                       (tcp_port, err))
+                to_add.append(tcp_port)
             else:
                 logger.debug('firewalld port %s is enabled in current zone' % tcp_port)
+        if to_add:
+            cmd = [self.cmd, '--permanent']
+            for tcp_port in to_add:
+                cmd += ['--add-port', tcp_port]
+            out, err, ret = call(self.ctx, cmd)
+            if ret:
+                raise RuntimeError('unable to add port %s to current zone: %s' %
+                                   (', '.join(to_add), err))
+            self.changed = True
 
     def close_ports(self, fw_ports):
         # type: (List[int]) -> None
@@ -2924,19 +3265,35 @@ class Firewalld(object):
         if not self.cmd:
             raise RuntimeError('command not defined')
 
-        for port in fw_ports:
-            tcp_port = str(port) + '/tcp'
-            out, err, ret = call(self.ctx, [self.cmd, '--permanent', '--query-port', tcp_port], verbosity=CallVerbosity.DEBUG)
-            if not ret:
+        enabled = self._permanent_ports()
+        to_remove = []  # type: List[str]
+        for tcp_port in [f'{p}/tcp' for p in fw_ports]:
+            if tcp_port in enabled:
                 logger.info('Disabling port %s in current zone...' % tcp_port)
-                out, err, ret = call(self.ctx, [self.cmd, '--permanent', '--remove-port', tcp_port])
-                if ret:
-                    raise RuntimeError('unable to remove port %s from current zone: %s' %
-                                       (tcp_port, err))
-                else:
-                    logger.info(f'Port {tcp_port} disabled')
+                to_remove.append(tcp_port)
             else:
                 logger.info(f'firewalld port {tcp_port} already closed')
+        if to_remove:
+            cmd = [self.cmd, '--permanent']
+            for tcp_port in to_remove:
+                cmd += ['--remove-port', tcp_port]
+            out, err, ret = call(self.ctx, cmd)
+            if ret:
+                raise RuntimeError('unable to remove port %s from current zone: %s' %
+                                   (', '.join(to_remove), err))
+            self.changed = True
+            for tcp_port in to_remove:
+                logger.info(f'Port {tcp_port} disabled')
+
+    def _permanent_ports(self):
+        # type: () -> Set[str]
+        """ports of the current zone, one call instead of a --query-port per port"""
+        assert self.cmd
+        out, err, ret = call(self.ctx, [self.cmd, '--permanent', '--list-ports'],
+                             verbosity=CallVerbosity.DEBUG)
+        if ret:
+            return set()
+        return set(out.split())
 
     def apply_rules(self):
         # type: () -> None
@@ -2946,7 +3303,11 @@ class Firewalld(object):
         if not self.cmd:
             raise RuntimeError('command not defined')
 
+        if not self.changed:
+            logger.debug('firewalld rules unchanged, not reloading')
+            return
         call_throws(self.ctx, [self.cmd, '--reload'])
+        self.changed = False
 
 
 def update_firewalld(ctx, daemon_type):
@@ -2960,18 +3321,18 @@ def install_sysctl(ctx: CephadmContext, fsid: str, daemon_type: str) -> None:
     """
     Set up sysctl settings
     """
-    def _write(conf: Path, lines: List[str]) -> None:
+    def _write(conf: Path, settings: Tuple[str, ...]) -> None:
         lines = [
             '# created by cephadm',
             '',
-            *lines,
+            *settings,
             '',
         ]
         with open(conf, 'w') as f:
             f.write('\n'.join(lines))
 
     conf = Path(ctx.sysctl_dir).joinpath(f'90-ceph-{fsid}-{daemon_type}.conf')
-    lines: Optional[List] = None
+    lines: Optional[Tuple[str, ...]] = None
 
     if daemon_type == 'osd':
         lines = OSD.get_sysctl_settings()
@@ -2986,21 +3347,36 @@ def install_sysctl(ctx: CephadmContext, fsid: str, daemon_type: str) -> None:
         call_throws(ctx, ['sysctl', '--system'])
 
 
+def update_file(path, content):
+    # type: (str, str) -> bool
+    """
+    Write content to path with write_new() unless the file already holds
+    exactly that. Returns whether path existed before.
+    """
+    try:
+        with open(path, 'r') as f:
+            if f.read() == content:
+                return True
+        existed = True
+    except FileNotFoundError:
+        existed = False
+    with write_new(path, perms=None) as f:
+        f.write(content)
+    return existed
+
+
 def install_base_units(ctx, fsid):
     # type: (CephadmContext, str) -> None
     """
     Set up ceph.target and ceph-$fsid.target units.
     """
     # global unit
-    existed = os.path.exists(ctx.unit_dir + '/ceph.target')
-    with open(ctx.unit_dir + '/ceph.target.new', 'w') as f:
-        f.write('[Unit]\n'
-                'Description=All Ceph clusters and services\n'
-                '\n'
-                '[Install]\n'
-                'WantedBy=multi-user.target\n')
-        os.rename(ctx.unit_dir + '/ceph.target.new',
-                  ctx.unit_dir + '/ceph.target')
+    existed = update_file(ctx.unit_dir + '/ceph.target',
+                          '[Unit]\n'
+                          'Description=All Ceph clusters and services\n'
+                          '\n'
+                          '[Install]\n'
+                          'WantedBy=multi-user.target\n')
     if not existed:
         # we disable before enable in case a different ceph.target
         # (from the traditional package) is present; while newer
@@ -3012,35 +3388,30 @@ def install_base_units(ctx, fsid):
         call_throws(ctx, ['systemctl', 'start', 'ceph.target'])
 
     # cluster unit
-    existed = os.path.exists(ctx.unit_dir + '/ceph-%s.target' % fsid)
-    with open(ctx.unit_dir + '/ceph-%s.target.new' % fsid, 'w') as f:
-        f.write(
-            '[Unit]\n'
-            'Description=Ceph cluster {fsid}\n'
-            'PartOf=ceph.target\n'
-            'Before=ceph.target\n'
-            '\n'
-            '[Install]\n'
-            'WantedBy=multi-user.target ceph.target\n'.format(
-                fsid=fsid)
-        )
-        os.rename(ctx.unit_dir + '/ceph-%s.target.new' % fsid,
-                  ctx.unit_dir + '/ceph-%s.target' % fsid)
+    existed = update_file(
+        ctx.unit_dir + '/ceph-%s.target' % fsid,
+        '[Unit]\n'
+        'Description=Ceph cluster {fsid}\n'
+        'PartOf=ceph.target\n'
+        'Before=ceph.target\n'
+        '\n'
+        '[Install]\n'
+        'WantedBy=multi-user.target ceph.target\n'.format(
+            fsid=fsid)
+    )
     if not existed:
         call_throws(ctx, ['systemctl', 'enable', 'ceph-%s.target' % fsid])
         call_throws(ctx, ['systemctl', 'start', 'ceph-%s.target' % fsid])
 
     # logrotate for the cluster
-    with open(ctx.logrotate_dir + '/ceph-%s' % fsid, 'w') as f:
-        """
-        This is a bit sloppy in that the killall/pkill will touch all ceph daemons
-        in all containers, but I don't see an elegant way to send SIGHUP *just* to
-        the daemons for this cluster.  (1) systemd kill -s will get the signal to
-        podman, but podman will exit.  (2) podman kill will get the signal to the
-        first child (bash), but that isn't the ceph daemon.  This is simpler and
-        should be harmless.
-        """
-        f.write("""# created by cephadm
+    #
+    # This is a bit sloppy in that the killall/pkill will touch all ceph daemons
+    # in all containers, but I don't see an elegant way to send SIGHUP *just* to
+    # the daemons for this cluster.  (1) systemd kill -s will get the signal to
+    # podman, but podman will exit.  (2) podman kill will get the signal to the
+    # first child (bash), but that isn't the ceph daemon.  This is simpler and
+    # should be harmless.
+    update_file(ctx.logrotate_dir + '/ceph-%s' % fsid, """# created by cephadm
 /var/log/ceph/%s/*.log {
     rotate 7
     daily
@@ -3056,19 +3427,7 @@ def install_base_units(ctx, fsid):
 """ % fsid)
 
 
-def get_unit_file(ctx, fsid):
-    # type: (CephadmContext, str) -> str
-    extra_args = ''
-    if isinstance(ctx.container_engine, Podman):
-        extra_args = ('ExecStartPre=-/bin/rm -f %t/%n-pid %t/%n-cid\n'
-                      'ExecStopPost=-/bin/rm -f %t/%n-pid %t/%n-cid\n'
-                      'Type=forking\n'
-                      'PIDFile=%t/%n-pid\n')
-        if ctx.container_engine.version >= CGROUPS_SPLIT_PODMAN_VERSION:
-            extra_args += 'Delegate=yes\n'
-
-    docker = isinstance(ctx.container_engine, Docker)
-    u = """# generated by cephadm
+UNIT_FILE_TEMPLATE = """# generated by cephadm
 [Unit]
 Description=Ceph %i for {fsid}
 
@@ -3100,15 +3459,39 @@ StartLimitBurst=5
 {extra_args}
 [Install]
 WantedBy=ceph-{fsid}.target
-""".format(container_path=ctx.container_engine.path,
-           fsid=fsid,
-           data_dir=ctx.data_dir,
-           extra_args=extra_args,
-           # if docker, we depend on docker.service
-           docker_after=' docker.service' if docker else '',
-           docker_requires='Requires=docker.service\n' if docker else '')
+"""
+
+
+def get_unit_file(ctx, fsid):
+    # type: (CephadmContext, str) -> str
+    podman = isinstance(ctx.container_engine, Podman)
+    return _render_unit_file(
+        ctx.container_engine.path, fsid, ctx.data_dir,
+        podman,
+        podman and ctx.container_engine.version >= CGROUPS_SPLIT_PODMAN_VERSION,
+        isinstance(ctx.container_engine, Docker))
+
+
+@lru_cache(maxsize=16)
+def _render_unit_file(container_path, fsid, data_dir, podman, delegate, docker):
+    # type: (str, str, str, bool, bool, bool) -> str
+    extra_args = ''
+    if podman:
+        extra_args = ('ExecStartPre=-/bin/rm -f %t/%n-pid %t/%n-cid\n'
+                      'ExecStopPost=-/bin/rm -f %t/%n-pid %t/%n-cid\n'
+                      'Type=forking\n'
+                      'PIDFile=%t/%n-pid\n')
+        if delegate:
+            extra_args += 'Delegate=yes\n'
 
-    return u
+    return UNIT_FILE_TEMPLATE.format(
+        container_path=container_path,
+        fsid=fsid,
+        data_dir=data_dir,
+        extra_args=extra_args,
+        # if docker, we depend on docker.service
+        docker_after=' docker.service' if docker else '',
+        docker_requires='Requires=docker.service\n' if docker else '')
 
 ##################################
 
@@ -3160,8 +3543,8 @@ class CephContainer:
         ]
 
         if isinstance(self.ctx.container_engine, Podman):
-            if os.path.exists('/etc/ceph/podman-auth.json'):
-                cmd_args.append('--authfile=/etc/ceph/podman-auth.json')
+            if has_podman_authfile():
+                cmd_args.append('--authfile=%s' % PODMAN_AUTHFILE)
 
         envs: List[str] = [
             '-e', 'CONTAINER_IMAGE=%s' % self.image,
@@ -3199,11 +3582,12 @@ class CephContainer:
             for env in self.envs:
                 envs.extend(['-e', env])
 
-        vols = sum(
-            [['-v', '%s:%s' % (host_dir, container_dir)]
-             for host_dir, container_dir in self.volume_mounts.items()], [])
-        binds = sum([['--mount', '{}'.format(','.join(bind))]
-                     for bind in self.bind_mounts], [])
+        vols = [arg
+                for host_dir, container_dir in self.volume_mounts.items()
+                for arg in ('-v', '%s:%s' % (host_dir, container_dir))]
+        binds = [arg
+                 for bind in self.bind_mounts
+                 for arg in ('--mount', ','.join(bind))]
 
         return \
             cmd_args + self.container_args + \
@@ -3241,11 +3625,12 @@ class CephContainer:
             for env in self.envs:
                 envs.extend(['-e', env])
 
-        vols = sum(
-            [['-v', '%s:%s' % (host_dir, container_dir)]
-             for host_dir, container_dir in self.volume_mounts.items()], [])
-        binds = sum([['--mount', '{}'.format(','.join(bind))]
-                     for bind in self.bind_mounts], [])
+        vols = [arg
+                for host_dir, container_dir in self.volume_mounts.items()
+                for arg in ('-v', '%s:%s' % (host_dir, container_dir))]
+        binds = [arg
+                 for bind in self.bind_mounts
+                 for arg in ('--mount', ','.join(bind))]
 
         return cmd_args + self.container_args + envs + vols + binds + [
             '--entrypoint', cmd[0],
@@ -3309,6 +3694,9 @@ def command_pull(ctx):
     return command_inspect_image(ctx)
 
 
+PULL_RETRIES = 6
+
+
 def _pull_image(ctx, image):
     # type: (CephadmContext, str) -> None
     logger.info('Pulling container image %s...' % image)
@@ -3320,11 +3708,13 @@ def _pull_image(ctx, image):
     ]
 
     cmd = [ctx.container_engine.path, 'pull', image]
-    if isinstance(ctx.container_engine, Podman) and os.path.exists('/etc/ceph/podman-auth.json'):
-        cmd.append('--authfile=/etc/ceph/podman-auth.json')
+    if isinstance(ctx.container_engine, Podman) and has_podman_authfile():
+        cmd.append('--authfile=%s' % PODMAN_AUTHFILE)
     cmd_str = ' '.join(cmd)
 
-    for sleep_secs in [1, 4, 25]:
+    # exponential backoff with jitter: short blips are retried within a
+    # second; the waits between the attempts add up to ~15s
+    for attempt in range(PULL_RETRIES):
         out, err, ret = call(ctx, cmd)
         if not ret:
             return
@@ -3332,7 +3722,11 @@ def _pull_image(ctx, image):
         if not any(pattern in err for pattern in ignorelist):
             raise RuntimeError('Failed command: %s' % cmd_str)
 
-        logger.info('`%s` failed transiently. Retrying. waiting %s seconds...' % (cmd_str, sleep_secs))
+        if attempt == PULL_RETRIES - 1:
+            # no point in waiting after the final attempt
+            break
+        sleep_secs = min(16.0, 0.5 * 2 ** attempt) * random.uniform(0.8, 1.2)
+        logger.info('`%s` failed transiently. Retrying. waiting %.1f seconds...' % (cmd_str, sleep_secs))
         time.sleep(sleep_secs)
 
     raise RuntimeError('Failed command: %s: maximum retries reached' % cmd_str)
@@ -3387,6 +3781,9 @@ def get_image_info_from_inspect(out, image):
 ##################################
 
 
+CIDR_RE = re.compile(r'/\d+$')
+
+
 def check_subnet(subnets: str) -> Tuple[int, List[int], str]:
     """Determine whether the given string is a valid subnet
 
@@ -3400,7 +3797,7 @@ def check_subnet(subnets: str) -> Tuple[int, List[int], str]:
     subnet_list = subnets.split(',')
     for subnet in subnet_list:
         # ensure the format of the string is as expected address/netmask
-        if not re.search(r'\/\d+$', subnet):
+        if not CIDR_RE.search(subnet):
             rc = 1
             errors.append(f'{subnet} is not in CIDR format (address/netmask)')
             continue
@@ -3427,6 +3824,9 @@ def wrap_ipv6(address):
     # We cannot assume it's already wrapped or even an IPv6 address if
     # it's already wrapped it'll not pass (like if it's a hostname) and trigger
     # the ValueError
+    if ':' not in address:
+        # IPv4 or hostname, no need to parse it
+        return address
     try:
         if ipaddress.ip_address(address).version == 6:
             return f'[{address}]'
@@ -3446,10 +3846,13 @@ def is_ipv6(address):
         return False
 
 
+ADDR_PORT_RE = re.compile(r':(\d+)$')
+ADDR_PROTO_PREFIX_RE = re.compile(r'^\w+:')
+
+
 def prepare_mon_addresses(
     ctx: CephadmContext
 ) -> Tuple[str, bool, Optional[str]]:
-    r = re.compile(r':(\d+)$')
     base_ip = ''
     ipv6 = False
 
@@ -3457,9 +3860,9 @@ def prepare_mon_addresses(
         ipv6 = is_ipv6(ctx.mon_ip)
         if ipv6:
             ctx.mon_ip = wrap_ipv6(ctx.mon_ip)
-        hasport = r.findall(ctx.mon_ip)
+        hasport = ADDR_PORT_RE.search(ctx.mon_ip)
         if hasport:
-            port = int(hasport[0])
+            port = int(hasport.group(1))
             if port == 6789:
                 addr_arg = '[v1:%s]' % ctx.mon_ip
             elif port == 3300:
@@ -3468,7 +3871,7 @@ def prepare_mon_addresses(
                 logger.warning('Using msgr2 protocol for unrecognized port %d' %
                                port)
                 addr_arg = '[v2:%s]' % ctx.mon_ip
-            base_ip = ctx.mon_ip[0:-(len(str(port))) - 1]
+            base_ip = ctx.mon_ip[:hasport.start()]
             check_ip_port(ctx, base_ip, port)
         else:
             base_ip = ctx.mon_ip
@@ -3482,14 +3885,14 @@ def prepare_mon_addresses(
                         addr_arg)
         ipv6 = addr_arg.count('[') > 1
         for addr in addr_arg[1:-1].split(','):
-            hasport = r.findall(addr)
+            hasport = ADDR_PORT_RE.search(addr)
             if not hasport:
                 raise Error('--mon-addrv value %s must include port number' %
                             addr_arg)
-            port = int(hasport[0])
+            port = int(hasport.group(1))
+            base_ip = addr[:hasport.start()]
             # strip off v1: or v2: prefix
-            addr = re.sub(r'^\w+:', '', addr)
-            base_ip = addr[0:-(len(str(port))) - 1]
+            base_ip = ADDR_PROTO_PREFIX_RE.sub('', base_ip)
             check_ip_port(ctx, base_ip, port)
     else:
         raise Error('must specify --mon-ip or --mon-addrv')
@@ -3499,12 +3902,15 @@ def prepare_mon_addresses(
     if not ctx.skip_mon_network:
         # make sure IP is configured locally, and then figure out the
         # CIDR network
+        # `ip` prints addresses in their canonical form, so comparing
+        # against the canonical mon IP string needs no per-address parse
+        try:
+            mon_ip = str(ipaddress.ip_address(unwrap_ipv6(base_ip)))
+        except ValueError:
+            raise Error('Mon IP %s is not a valid IP address; pass an IP '
+                        'address rather than a hostname' % base_ip)
         for net, ifaces in list_networks(ctx).items():
-            ips: List[str] = []
-            for iface, ls in ifaces.items():
-                ips.extend(ls)
-            if ipaddress.ip_address(unwrap_ipv6(base_ip)) in \
-                    [ipaddress.ip_address(ip) for ip in ips]:
+            if any(mon_ip in ls for ls in ifaces.values()):
                 mon_network = net
                 logger.info('Mon IP %s is in CIDR network %s' % (base_ip,
                                                                  mon_network))
@@ -3545,24 +3951,18 @@ def create_initial_keys(
 
     # create some initial keys
     logger.info('Creating initial keys...')
-    mon_key = CephContainer(
-        ctx,
-        image=_image,
-        entrypoint='/usr/bin/ceph-authtool',
-        args=['--gen-print-key'],
-    ).run().strip()
-    admin_key = CephContainer(
-        ctx,
-        image=_image,
-        entrypoint='/usr/bin/ceph-authtool',
-        args=['--gen-print-key'],
-    ).run().strip()
-    mgr_key = CephContainer(
+    # one container for all three keys; starting a container costs far more
+    # than generating a key
+    out = CephContainer(
         ctx,
         image=_image,
-        entrypoint='/usr/bin/ceph-authtool',
-        args=['--gen-print-key'],
-    ).run().strip()
+        entrypoint='/bin/sh',
+        args=['-c', 'for k in mon admin mgr; do /usr/bin/ceph-authtool --gen-print-key || exit 1; done'],
+    ).run()
+    keys = out.split()
+    if len(keys) != 3:
+        raise Error('Failed to generate initial keys: %s' % out)
+    mon_key, admin_key, mgr_key = keys
 
     keyring = ('[mon.]\n'
                '\tkey = %s\n'
@@ -3675,8 +4075,8 @@ def wait_for_mon(
         ctx,
         image=ctx.image,
         entrypoint='/usr/bin/ceph',
-        args=[
-            'status'],
+        # 'mon stat' only needs the monmap, unlike a full 'status'
+        args=['mon', 'stat'],
         volume_mounts={
             mon_dir: '/var/lib/ceph/mon/ceph-%s:z' % (mon_id),
             admin_keyring_path: '/etc/ceph/ceph.client.admin.keyring:z',
@@ -3713,12 +4113,26 @@ def create_mgr(
     # wait for the service to become available
     logger.info('Waiting for mgr to start...')
 
+    # try the cheap 'mgr stat' first; only fall back to a full 'status'
+    # if this ceph version's 'mgr stat' doesn't report availability
+    use_mgr_stat = [True]
+
     def is_mgr_available():
         # type: () -> bool
         timeout = ctx.timeout if ctx.timeout else 60  # seconds
+        if use_mgr_stat[0]:
+            try:
+                out = clifunc(['mgr', 'stat', '-f', 'json'], timeout=timeout)
+                j = json_loads(out)
+                if 'available' in j:
+                    return j['available']
+                use_mgr_stat[0] = False
+            except Exception as e:
+                logger.debug('mgr stat failed: %s' % e)
+                return False
         try:
-            out = clifunc(['status', '-f', 'json-pretty'], timeout=timeout)
-            j = json.loads(out)
+            out = clifunc(['status', '-f', 'json'], timeout=timeout)
+            j = json_loads(out)
             return j.get('mgrmap', {}).get('available', False)
         except Exception as e:
             logger.debug('status failed: %s' % e)
@@ -3770,22 +4184,19 @@ def prepare_ssh(
             makedirs(ssh_dir, ssh_uid, ssh_gid, 0o700)
 
         auth_keys_file = '%s/authorized_keys' % ssh_dir
-        add_newline = False
-
-        if os.path.exists(auth_keys_file):
-            with open(auth_keys_file, 'r') as f:
-                f.seek(0, os.SEEK_END)
-                if f.tell() > 0:
-                    f.seek(f.tell() - 1, os.SEEK_SET)  # go to last char
-                    if f.read() != '\n':
-                        add_newline = True
-
-        with open(auth_keys_file, 'a') as f:
-            os.fchown(f.fileno(), ssh_uid, ssh_gid)  # just in case we created it
-            os.fchmod(f.fileno(), 0o600)  # just in case we created it
-            if add_newline:
-                f.write('\n')
-            f.write(ssh_pub.strip() + '\n')
+        fd = os.open(auth_keys_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.fchown(fd, ssh_uid, ssh_gid)  # just in case we created it
+            os.fchmod(fd, 0o600)  # just in case we created it
+            # peek at the last char to see if the file ends with a newline
+            size = os.fstat(fd).st_size
+            add_newline = size > 0 and os.pread(fd, 1, size - 1) != b'\n'
+            data = (('\n' if add_newline else '') + ssh_pub.strip() + '\n').encode('utf-8')
+            while data:
+                # os.write() may write only part of the buffer
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
 
     host = get_hostname()
     logger.info('Adding host %s...' % host)
@@ -3797,24 +4208,32 @@ def prepare_ssh(
     except RuntimeError as e:
         raise Error('Failed to add host <%s>: %s' % (host, e))
 
+    # collect the default service specs and apply them with a single
+    # 'orch apply -i' instead of launching one container per service
+    specs = []
     for t in ['mon', 'mgr']:
         if not ctx.orphan_initial_daemons:
             logger.info('Deploying %s service with default placement...' % t)
-            cli(['orch', 'apply', t])
+            specs.append('service_type: %s\n' % t)
         else:
             logger.info('Deploying unmanaged %s service...' % t)
-            cli(['orch', 'apply', t, '--unmanaged'])
+            specs.append('service_type: %s\nunmanaged: true\n' % t)
 
     if not ctx.orphan_initial_daemons:
         logger.info('Deploying crash service with default placement...')
-        cli(['orch', 'apply', 'crash'])
+        specs.append('service_type: crash\n')
 
     if not ctx.skip_monitoring_stack:
         logger.info('Enabling mgr prometheus module...')
         cli(['mgr', 'module', 'enable', 'prometheus'])
         for t in ['prometheus', 'grafana', 'node-exporter', 'alertmanager']:
             logger.info('Deploying %s service with default placement...' % t)
-            cli(['orch', 'apply', t])
+            specs.append('service_type: %s\n' % t)
+
+    with tempfile.NamedTemporaryFile(buffering=0) as tmp:
+        tmp.write('---\n'.join(specs).encode('utf-8'))
+        cli(['orch', 'apply', '-i', '/tmp/default-services.yml'],
+            {tmp.name: '/tmp/default-services.yml:z'})
 
 
 def enable_cephadm_mgr_module(
@@ -3970,17 +4389,27 @@ def finish_bootstrap_config(
             get_unit_name(fsid, 'mon', mon_id)
         ])
 
+    # run the 'config set's in a single container rather than launching
+    # one per option. Not assimilate-conf: that silently skips options
+    # which already have a different value in the config database.
+    options = []  # type: List[Tuple[str, str, str]]
     if mon_network:
         logger.info(f'Setting mon public_network to {mon_network}')
-        cli(['config', 'set', 'mon', 'public_network', mon_network])
+        options.append(('mon', 'public_network', mon_network))
 
     if cluster_network:
         logger.info(f'Setting cluster_network to {cluster_network}')
-        cli(['config', 'set', 'global', 'cluster_network', cluster_network])
+        options.append(('global', 'cluster_network', cluster_network))
 
     if ipv6 or ipv6_cluster_network:
         logger.info('Enabling IPv6 (ms_bind_ipv6) binding')
-        cli(['config', 'set', 'global', 'ms_bind_ipv6', 'true'])
+        options.append(('global', 'ms_bind_ipv6', 'true'))
+
+    if options:
+        script = ' && '.join(
+            ' '.join(shlex.quote(a) for a in ['/usr/bin/ceph', 'config', 'set', who, name, value])
+            for who, name, value in options)
+        cli(['-c', script], entrypoint='/bin/sh')
 
     with open(ctx.output_config, 'w') as f:
         f.write(config)
@@ -4080,8 +4509,8 @@ def command_bootstrap(ctx):
     tmp_config = write_tmp(config, uid, gid)
 
     # a CLI helper to reduce our typing
-    def cli(cmd, extra_mounts={}, timeout=DEFAULT_TIMEOUT):
-        # type: (List[str], Dict[str, str], Optional[int]) -> str
+    def cli(cmd, extra_mounts={}, timeout=DEFAULT_TIMEOUT, entrypoint='/usr/bin/ceph'):
+        # type: (List[str], Dict[str, str], Optional[int], str) -> str
         mounts = {
             log_dir: '/var/log/ceph:z',
             admin_keyring.name: '/etc/ceph/ceph.client.admin.keyring:z',
@@ -4093,7 +4522,7 @@ def command_bootstrap(ctx):
         return CephContainer(
             ctx,
             image=ctx.image,
-            entrypoint='/usr/bin/ceph',
+            entrypoint=entrypoint,
             args=cmd,
             volume_mounts=mounts,
         ).run(timeout=timeout)
@@ -4145,7 +4574,7 @@ def command_bootstrap(ctx):
             # type: () -> bool
             try:
                 out = cli(['tell', 'mgr', 'mgr_status'])
-                j = json.loads(out)
+                j = json_loads(out)
                 return j['mgrmap_epoch'] >= epoch
             except Exception as e:
                 logger.debug('tell mgr mgr_status failed: %s' % e)
@@ -4200,18 +4629,24 @@ def command_bootstrap(ctx):
     if ctx.apply_spec:
         logger.info('Applying %s to cluster' % ctx.apply_spec)
 
+        # collect the unique remote hosts first so each one gets the key
+        # only once
+        hosts = {}  # type: Dict[str, None]
         with open(ctx.apply_spec) as f:
             for line in f:
                 if 'hostname:' in line:
-                    line = line.replace('\n', '')
-                    split = line.split(': ')
-                    if split[1] != hostname:
-                        logger.info('Adding ssh key to %s' % split[1])
+                    host = line.split(': ', 1)[1].strip().strip('\'"')
+                    if host != hostname:
+                        hosts[host] = None
+
+        ssh_key = '/etc/ceph/ceph.pub'
+        if ctx.ssh_public_key:
+            ssh_key = ctx.ssh_public_key.name
 
-                        ssh_key = '/etc/ceph/ceph.pub'
-                        if ctx.ssh_public_key:
-                            ssh_key = ctx.ssh_public_key.name
-                        out, err, code = call_throws(ctx, ['sudo', '-u', ctx.ssh_user, 'ssh-copy-id', '-f', '-i', ssh_key, '-o StrictHostKeyChecking=no', '%s@%s' % (ctx.ssh_user, split[1])])
+        # sequentially: ssh-copy-id may prompt for each host's password
+        for host in hosts:
+            logger.info('Adding ssh key to %s' % host)
+            call_throws(ctx, ['sudo', '-u', ctx.ssh_user, 'ssh-copy-id', '-f', '-i', ssh_key, '-o StrictHostKeyChecking=no', '%s@%s' % (ctx.ssh_user, host)])
 
         mounts = {}
         mounts[pathify(ctx.apply_spec)] = '/tmp/spec.yml:z'
@@ -4269,10 +4704,11 @@ def registry_login(ctx: CephadmContext, url, username, password):
                '-u', username, '-p', password,
                url]
         if isinstance(engine, Podman):
-            cmd.append('--authfile=/etc/ceph/podman-auth.json')
+            cmd.append('--authfile=%s' % PODMAN_AUTHFILE)
         out, _, _ = call_throws(ctx, cmd)
         if isinstance(engine, Podman):
-            os.chmod('/etc/ceph/podman-auth.json', 0o600)
+            os.chmod(PODMAN_AUTHFILE, 0o600)
+            has_podman_authfile.cache_clear()
     except Exception:
         raise Error('Failed to login to custom registry @ %s as %s with given password' % (ctx.registry_url, ctx.registry_username))
 
@@ -4347,8 +4783,8 @@ def command_deploy(ctx):
         # Default Checks
         # make sure provided config-json is sufficient
         config = get_parm(ctx.config_json)  # type: ignore
-        required_files = Monitoring.components[daemon_type].get('config-json-files', list())
-        required_args = Monitoring.components[daemon_type].get('config-json-args', list())
+        required_files = Monitoring.components[daemon_type].get('config-json-files', ())
+        required_args = Monitoring.components[daemon_type].get('config-json-args', ())
         if required_files:
             if not config or not all(c in config.get('files', {}).keys() for c in required_files):  # type: ignore
                 raise Error('{} deployment requires config-json which must '
@@ -4789,6 +5225,7 @@ def list_daemons(ctx, detail=True, legacy_dir=None):
     host_version: Optional[str] = None
     ls = []
     container_path = ctx.container_engine.path
+    exec_prefix = ctx.container_engine.exec_prefix
 
     data_dir = ctx.data_dir
     if legacy_dir is not None:
@@ -4879,13 +5316,13 @@ def list_daemons(ctx, detail=True, legacy_dir=None):
 
                         cmd = [
                             container_path, 'inspect',
-                            '--format', '{{.Id}},{{.Config.Image}},{{.Image}},{{.Created}},{{index .Config.Labels "io.ceph.version"}}',
+                            '--format', '{{.Id}},{{.Config.Image}},{{.Image}},{{.Created}},{{index .Config.Labels "io.ceph.version"}},{{index .Config.Labels "org.opencontainers.image.version"}}',
                             'ceph-%s-%s' % (fsid, j)
                         ]
                         out, err, code = call(ctx, cmd, verbosity=CallVerbosity.DEBUG)
                         if not code:
                             (container_id, image_name, image_id, start,
-                             version) = out.strip().split(',')
+                             version, image_version) = out.strip().split(',')
                             image_id = normalize_container_id(image_id)
                             daemon_type = name.split('.', 1)[0]
                             start_stamp = try_convert_datetime(start)
@@ -4909,6 +5346,15 @@ def list_daemons(ctx, detail=True, legacy_dir=None):
                             # identify software version inside the container (if we can)
                             if not version or '.' not in version:
                                 version = seen_versions.get(image_id, None)
+                            if not version and image_version and \
+                                    daemon_type in Monitoring.components and \
+                                    image_name.rpartition(':')[2].lstrip('v') == image_version.lstrip('v'):
+                                # use the OCI image label, saves us an exec into
+                                # the container. Labels are inherited from the
+                                # base image, so only trust it if it agrees with
+                                # the image tag (and isn't e.g. the base OS version)
+                                version = image_version.lstrip('v')
+                                seen_versions[image_id] = version
                             if daemon_type == NFSGanesha.daemon_type:
                                 version = NFSGanesha.get_version(ctx, container_id)
                             if daemon_type == CephIscsi.daemon_type:
@@ -4916,7 +5362,7 @@ def list_daemons(ctx, detail=True, legacy_dir=None):
                             elif not version:
                                 if daemon_type in Ceph.daemons:
                                     out, err, code = call(ctx,
-                                                          [container_path, 'exec', container_id,
+                                                          [*exec_prefix, container_id,
                                                            'ceph', '-v'],
                                                           verbosity=CallVerbosity.DEBUG)
                                     if not code and \
@@ -4925,7 +5371,7 @@ def list_daemons(ctx, detail=True, legacy_dir=None):
                                         seen_versions[image_id] = version
                                 elif daemon_type == 'grafana':
                                     out, err, code = call(ctx,
-                                                          [container_path, 'exec', container_id,
+                                                          [*exec_prefix, container_id,
                                                            'grafana-server', '-v'],
                                                           verbosity=CallVerbosity.DEBUG)
                                     if not code and \
@@ -4939,7 +5385,7 @@ def list_daemons(ctx, detail=True, legacy_dir=None):
                                     seen_versions[image_id] = version
                                 elif daemon_type == 'haproxy':
                                     out, err, code = call(ctx,
-                                                          [container_path, 'exec', container_id,
+                                                          [*exec_prefix, container_id,
                                                            'haproxy', '-v'],
                                                           verbosity=CallVerbosity.DEBUG)
                                     if not code and \
@@ -4948,7 +5394,7 @@ def list_daemons(ctx, detail=True, legacy_dir=None):
                                         seen_versions[image_id] = version
                                 elif daemon_type == 'keepalived':
                                     out, err, code = call(ctx,
-                                                          [container_path, 'exec', container_id,
+                                                          [*exec_prefix, container_id,
                                                            'keepalived', '--version'],
                                                           verbosity=CallVerbosity.DEBUG)
                                     if not code and \
@@ -5420,11 +5866,11 @@ def command_rm_daemon(ctx):
                     'this command may destroy precious data!')
 
     call(ctx, ['systemctl', 'stop', unit_name],
-         verbosity=CallVerbosity.DEBUG)
+         verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
     call(ctx, ['systemctl', 'reset-failed', unit_name],
-         verbosity=CallVerbosity.DEBUG)
+         verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
     call(ctx, ['systemctl', 'disable', unit_name],
-         verbosity=CallVerbosity.DEBUG)
+         verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
     data_dir = get_data_dir(ctx.fsid, ctx.data_dir, daemon_type, daemon_id)
     if daemon_type in ['mon', 'osd', 'prometheus'] and \
        not ctx.force_delete_data:
@@ -5523,24 +5969,24 @@ def command_rm_cluster(ctx):
             continue
         unit_name = get_unit_name(ctx.fsid, d['name'])
         call(ctx, ['systemctl', 'stop', unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
         call(ctx, ['systemctl', 'reset-failed', unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
         call(ctx, ['systemctl', 'disable', unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
 
     # cluster units
     for unit_name in ['ceph-%s.target' % ctx.fsid]:
         call(ctx, ['systemctl', 'stop', unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
         call(ctx, ['systemctl', 'reset-failed', unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
         call(ctx, ['systemctl', 'disable', unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
 
     slice_name = 'system-%s.slice' % (('ceph-%s' % ctx.fsid).replace('-', '\\x2d'))
     call(ctx, ['systemctl', 'stop', slice_name],
-         verbosity=CallVerbosity.DEBUG)
+         verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
 
     # osds?
     if ctx.zap_osds:
@@ -5676,6 +6122,8 @@ def command_prepare_host(ctx: CephadmContext) -> None:
         call_throws(ctx, ['hostname', ctx.expect_hostname])
         with open('/etc/hostname', 'w') as f:
             f.write(ctx.expect_hostname + '\n')
+        get_hostname.cache_clear()
+        get_fqdn.cache_clear()
 
     logger.info('Repeating the final host check...')
     command_check_host(ctx)
@@ -6293,6 +6741,16 @@ def read_file(path_list, file_name=''):
 ##################################
 
 
+def host_selinux_enabled(ctx):
+    # type: (CephadmContext) -> bool
+    # HostFacts() reads cpuinfo, meminfo and every NIC; only do that once
+    cached = getattr(ctx, '_selinux_enabled', None)
+    if cached is None:
+        cached = HostFacts(ctx).selinux_enabled
+        ctx._selinux_enabled = cached
+    return cached
+
+
 class HostFacts():
     _dmi_path_list = ['/sys/class/dmi/id']
     _nic_path_list = ['/sys/class/net']
@@ -7244,6 +7702,7 @@ class CephadmDaemon():
 
     def shutdown(self, *args):
         logger.info('Shutdown request received')
+        flush_log_handlers()
         self.stop = True
         self.http_server.shutdown()
 
@@ -7379,9 +7838,9 @@ WantedBy=ceph-{fsid}.target
 
         call_throws(self.ctx, ['systemctl', 'daemon-reload'])
         call(self.ctx, ['systemctl', 'stop', self.unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
         call(self.ctx, ['systemctl', 'reset-failed', self.unit_name],
-             verbosity=CallVerbosity.DEBUG)
+             verbosity=CallVerbosity.DEBUG, capture_stdout=False, capture_stderr=False)
         call_throws(self.ctx, ['systemctl', 'enable', '--now', self.unit_name])
 
     @classmethod
@@ -8163,14 +8622,23 @@ def cephadm_init_ctx(args: List[str]) -> CephadmContext:
     return ctx
 
 
+def configure_logging():
+    # type: () -> None
+    global _LOGGING_CONFIGURED
+    if _LOGGING_CONFIGURED:
+        return
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
+    dictConfig(logging_config)
+    _LOGGING_CONFIGURED = True
+
+
 def cephadm_init(args: List[str]) -> CephadmContext:
     global logger
     ctx = cephadm_init_ctx(args)
 
     # Logger configuration
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
-    dictConfig(logging_config)
+    configure_logging()
     logger = logging.getLogger()
 
     if not os.path.exists(ctx.logrotate_dir + '/cephadm'):
@@ -8204,6 +8672,16 @@ def main():
     av = sys.argv[1:]
 
     ctx = cephadm_init(av)
+
+    def _terminate(signum, frame):
+        # the default SIGTERM action (e.g. the mgr timing us out) would skip
+        # the atexit flush of the buffered log records. Flush, then die by
+        # the signal as before.
+        flush_log_handlers()
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+    signal.signal(signal.SIGTERM, _terminate)
+
     if not ctx.has_function():
         sys.stderr.write('No command specified; pass -h or --help for usage\n')
         sys.exit(1)